@@ -1,25 +1,70 @@
 import os
+import json
+import uuid
+import hashlib
 import uvicorn
 import traceback
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-from src.vectorstore import FaissVectorStore
+from src.index_manager import IndexManager, InvalidDPRId
 from src.dpr_loader import load_dpr_pdf
+from src.pdf_document import extract_document
+from src.section_index import SectionIndex, build_section_index
+from src.embedding import EmbeddingPipeline
 from src.search import RAGSearch
 from src.evaluation import DPRAssistant  # <-- updated assistant
 from src.web_search import duckduckgo_search
+from src.llm import llm_cache_stats
+from src.embedding_models import embedding_cache_stats
+from src.jobs import JobQueue, QueueFull
+from src.sor_database import get_sor_database
 
 load_dotenv()
 
+PERSIST_DIR = "dpr_faiss_store"
+
+# Service singletons, created in lifespan() rather than at import: BOQ
+# table workers are spawned processes that re-import this module, and
+# must not each load the models and start a job queue.
+indexes: IndexManager | None = None
+rag: RAGSearch | None = None
+ingest: EmbeddingPipeline | None = None
+dpr_eval: DPRAssistant | None = None
+jobs: JobQueue | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global indexes, rag, ingest, dpr_eval, jobs
+
+    # FAISS store + RAG engine (one index namespace per DPR: dpr_faiss_store/<dpr_id>/)
+    indexes = IndexManager(PERSIST_DIR)
+    rag = RAGSearch(persist_dir=PERSIST_DIR, indexes=indexes)
+    ingest = EmbeddingPipeline()   # page -> chunk splitting + dedupe for indexing
+
+    # DPR Assistant (AI Model)
+    dpr_eval = DPRAssistant()   # uses updated evaluation + annotate_pdf internally
+
+    # Background job queue for the upload pipeline
+    jobs = JobQueue()   # JOB_WORKERS threads, JOB_QUEUE_DEPTH pending jobs
+
+    # load the SOR now so a missing / empty SOR_PATH is reported at startup
+    await run_in_threadpool(get_sor_database)
+    yield
+
+
 # ---------------------------------------------------
 # Initialize FastAPI
 # ---------------------------------------------------
-app = FastAPI(title="Advanced DPR Intelligence API")
+app = FastAPI(title="Advanced DPR Intelligence API", lifespan=lifespan)
 
 # ---------------------------------------------------
 # Ensure required directories exist BEFORE mounting
@@ -46,76 +91,159 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# ---------------------------------------------------
-# FAISS store + RAG engine setup
-# ---------------------------------------------------
-PERSIST_DIR = "dpr_faiss_store"
-store = FaissVectorStore(PERSIST_DIR)
-rag = RAGSearch(persist_dir=PERSIST_DIR)
-
-# ---------------------------------------------------
-# DPR Assistant (AI Model)
-# ---------------------------------------------------
-dpr_eval = DPRAssistant()   # uses updated evaluation + annotate_pdf internally
+UPLOAD_CHUNK_SIZE = 1024 * 1024   # stream uploads to disk 1 MiB at a time
+
+
+def process_dpr(job, save_path, filename, dpr_id, previous_dpr_id=None, digest=None):
+    """
+    Full upload pipeline, executed on a job worker thread:
+    Process → Index → Evaluate → Annotate. Reports progress per stage.
+    With `previous_dpr_id` (an earlier revision) only changed pages and
+    stages are re-run and the response carries an issue diff.
+    `digest` is the upload's sha256, so the PDF is not hashed again.
+    """
+    # -----------------------------
+    # LOAD PDF INTO TEXT CHUNKS
+    # -----------------------------
+    with job.stage("load_pdf"):
+        docs = load_dpr_pdf(save_path, sha256=digest)
+
+    # -----------------------------
+    # SECTION INDEX (outline / heading typography -> page + char ranges)
+    # -----------------------------
+    with job.stage("sections"):
+        sections = build_section_index(extract_document(save_path, sha256=digest))
+
+    # -----------------------------
+    # BUILD FAISS INDEX (own namespace per DPR)
+    # identical content was already indexed -> reuse it
+    # -----------------------------
+    with job.stage("index"), indexes.build_lock(dpr_id):
+        store = indexes.get(dpr_id)
+        if store is None:
+            chunks = ingest.prepare(docs)
+            store = indexes.build(dpr_id, chunks, filename=filename, pdf_path=save_path)
+        indexes.save_sections(dpr_id, sections.to_dict())
+
+    # -----------------------------
+    # MERGE ALL TEXT INTO SINGLE DOCUMENT
+    # -----------------------------
+    dpr_text = "\n\n".join([d.page_content for d in docs])
+
+    # -----------------------------
+    # RUN FULL EVALUATION PIPELINE
+    # -----------------------------
+    previous = indexes.load_eval_state(previous_dpr_id) if previous_dpr_id else None
+    result = dpr_eval.evaluate(
+        dpr_text, pdf_path=save_path, progress=job.stage_event,
+        previous=previous, store=store,   # module context is retrieved from the index
+        sections=sections
+    )
+    indexes.save_eval_state(dpr_id, result["state"])
+
+    # result contains:
+    # - "report"
+    # - "issues"
+    # - "highlighted_pdf"
+    # - "timings" (per-stage start/duration)
+    # - "compliance" (per-scheme rule coverage with page evidence)
+    # - "diff" (added / removed issues vs previous_dpr_id, else None)
+    # - "state" (persisted for the next incremental run)
+
+    response = {
+        "status": "success",
+        "dpr_id": dpr_id,
+        "previous_dpr_id": previous_dpr_id,   # the revision "diff" is against
+        "evaluation": result["report"],
+        "issues": result["issues"],
+        "highlighted_pdf": result["highlighted_pdf"],
+        "timings": result["timings"],
+        "compliance": result["compliance"],
+        "diff": result["diff"]
+    }
+    indexes.save_evaluation(dpr_id, response)
+    return response
+
+
+def store_upload(src) -> tuple:
+    """
+    Stream an uploaded file object to uploads/<sha256>.pdf, hashing while
+    writing (content-addressed). Blocking: run it off the event loop.
+    Returns (save_path, digest).
+    """
+    tmp_path = os.path.join("uploads", f".incoming-{uuid.uuid4().hex}")
+    sha = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as f:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                sha.update(chunk)
+                f.write(chunk)
+
+        digest = sha.hexdigest()
+        save_path = os.path.join("uploads", f"{digest}.pdf")
+        if os.path.exists(save_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, save_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return save_path, digest
 
 
 # ----------------------------------------------------------
-# 📌 1. Upload DPR → Process → Evaluate → Annotate → Return JSON
+# 📌 1. Upload DPR → enqueue job → poll /jobs/{id} → fetch result
 # ----------------------------------------------------------
 @app.post("/upload_dpr")
-async def upload_dpr(file: UploadFile = File(...)):
+async def upload_dpr(file: UploadFile = File(...), previous_dpr_id: Optional[str] = Form(None)):
     try:
-        # -----------------------------
-        # SAVE THE PDF
-        # -----------------------------
-        save_path = os.path.join("uploads", file.filename)
-
-        with open(save_path, "wb") as f:
-            f.write(await file.read())
-
-        print(f"[INFO] PDF saved at: {save_path}")
-
-        # -----------------------------
-        # LOAD PDF INTO TEXT CHUNKS
-        # -----------------------------
-        docs = load_dpr_pdf(save_path)
+        if previous_dpr_id and not await run_in_threadpool(indexes.exists, previous_dpr_id):
+            return JSONResponse(status_code=404, content={"error": f"Unknown previous_dpr_id {previous_dpr_id}"})
 
         # -----------------------------
-        # BUILD FAISS INDEX
+        # SAVE THE PDF (streamed, hashed while writing, content-addressed)
+        # file I/O and hashing run on the threadpool, not the event loop
         # -----------------------------
-        store.build_from_documents(docs)
-        store.save()
+        save_path, digest = await run_in_threadpool(store_upload, file.file)
 
-        # Make RAG use newly built FAISS
-        rag.vectorstore = store
-
-        # -----------------------------
-        # MERGE ALL TEXT INTO SINGLE DOCUMENT
-        # -----------------------------
-        dpr_text = "\n\n".join([d.page_content for d in docs])
-
-        # -----------------------------
-        # PASS PDF PATH TO AI EVALUATOR
-        # -----------------------------
-        dpr_eval.input_pdf_path = save_path
+        print(f"[INFO] PDF saved at: {save_path}")
 
         # -----------------------------
-        # RUN FULL EVALUATION PIPELINE
+        # SAME CONTENT ALREADY EVALUATED -> reuse
+        # the stored "diff" is only valid against the same previous revision;
+        # without one there is nothing to diff against
         # -----------------------------
-        result = dpr_eval.evaluate(dpr_text)
-
-        # result contains:
-        # - "report"
-        # - "issues"
-        # - "highlighted_pdf"
+        dpr_id = digest[:24]
+        cached = await run_in_threadpool(indexes.load_evaluation, dpr_id)
+        if cached is not None and not previous_dpr_id:
+            print(f"[INFO] Reusing evaluation for duplicate upload {dpr_id}")
+            return {**cached, "previous_dpr_id": None, "diff": None, "deduplicated": True}
+        if cached is not None and cached.get("previous_dpr_id") == previous_dpr_id:
+            print(f"[INFO] Reusing evaluation for duplicate upload {dpr_id} against {previous_dpr_id}")
+            return {**cached, "deduplicated": True}
+
+        # identical uploads against the same previous revision share one job
+        job = jobs.submit(
+            "upload_dpr", process_dpr, save_path, file.filename, dpr_id, previous_dpr_id, digest,
+            meta={"dpr_id": dpr_id, "previous_dpr_id": previous_dpr_id},
+            key=f"{dpr_id}:{previous_dpr_id or ''}"
+        )
 
-        return {
-            "status": "success",
-            "evaluation": result["report"],
-            "issues": result["issues"],
-            "highlighted_pdf": result["highlighted_pdf"]
-        }
+        return JSONResponse(
+            status_code=202,
+            content={
+                "status": "queued",
+                "job_id": job.id,
+                "dpr_id": dpr_id,
+                "status_url": f"/jobs/{job.id}",
+                "result_url": f"/jobs/{job.id}/result"
+            }
+        )
 
+    except QueueFull as e:
+        return JSONResponse(status_code=429, content={"error": str(e)})
+    except InvalidDPRId as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(
@@ -124,19 +252,88 @@ async def upload_dpr(file: UploadFile = File(...)):
         )
 
 
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job id"})
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job id"})
+    if job.status == "failed":
+        return JSONResponse(status_code=500, content={"error": job.error})
+    if job.status != "done":
+        return JSONResponse(status_code=202, content={"status": job.status, "job_id": job.id})
+    return job.result
+
+
 # ----------------------------------------------------------
 # 📌 2. Ask Questions About DPR (RAG)
 # ----------------------------------------------------------
 class QueryRequest(BaseModel):
     query: str
     top_k: int = 5
+    dpr_id: Optional[str] = None   # defaults to the most recent upload
 
 
 @app.post("/ask")
 def ask(req: QueryRequest):
     try:
-        answer = rag.search_and_summarize(req.query, top_k=req.top_k)
+        answer = rag.search_and_summarize(req.query, top_k=req.top_k, dpr_id=req.dpr_id)
         return {"answer": answer}
+    except InvalidDPRId as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.post("/ask/stream")
+def ask_stream(req: QueryRequest):
+    """
+    Server-Sent Events: one `data: "<token>"` event per generated chunk
+    (JSON-encoded so newlines survive), then `event: done`.
+    """
+    if req.dpr_id:
+        try:
+            indexes.path(req.dpr_id)
+        except InvalidDPRId as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+    def events():
+        try:
+            for token in rag.stream_search_and_summarize(req.query, top_k=req.top_k, dpr_id=req.dpr_id):
+                yield f"data: {json.dumps(token)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            traceback.print_exc()
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 5
+    dpr_id: Optional[str] = None
+
+
+@app.post("/ask_batch")
+def ask_batch(req: BatchQueryRequest):
+    try:
+        answers = rag.search_and_summarize_batch(req.queries, top_k=req.top_k, dpr_id=req.dpr_id)
+        return {"answers": [{"query": q, "answer": a} for q, a in zip(req.queries, answers)]}
+    except InvalidDPRId as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -158,21 +355,42 @@ def search_web(q: str):
 # 📌 4. Re-evaluate DPR (without re-uploading)
 # ----------------------------------------------------------
 @app.post("/evaluate_dpr")
-def reevaluate():
+def reevaluate(dpr_id: Optional[str] = None):
     try:
-        if not store.safe_load():
+        dpr_id = dpr_id or indexes.latest()
+        store = indexes.get(dpr_id) if dpr_id else None
+        if store is None:
             return {"error": "No FAISS index found — upload a DPR first"}
 
-        dpr_text = "\n\n".join([m["text"] for m in store.metadata])
-
-        result = dpr_eval.evaluate(dpr_text)
+        # index holds overlapping, deduped chunks: rebuild page text from the PDF
+        pdf_path = indexes.manifest(dpr_id).get("pdf_path")
+        docs = load_dpr_pdf(pdf_path) if pdf_path and os.path.exists(pdf_path) else []
+        if docs:
+            dpr_text = "\n\n".join([d.page_content for d in docs])
+        else:
+            dpr_text = "\n\n".join([m["text"] for m in store.metadata])
+
+        # only pages / stages whose inputs changed since the last run are redone
+        saved_sections = indexes.load_sections(dpr_id)
+        result = dpr_eval.evaluate(
+            dpr_text, pdf_path=pdf_path,
+            previous=indexes.load_eval_state(dpr_id), store=store,
+            sections=SectionIndex.from_dict(saved_sections) if saved_sections else None
+        )
+        indexes.save_eval_state(dpr_id, result["state"])
 
         return {
+            "dpr_id": dpr_id,
             "evaluation": result["report"],
             "issues": result["issues"],
-            "highlighted_pdf": result["highlighted_pdf"]
+            "highlighted_pdf": result["highlighted_pdf"],
+            "timings": result["timings"],
+            "compliance": result["compliance"],
+            "diff": result["diff"]
         }
 
+    except InvalidDPRId as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -183,7 +401,12 @@ def reevaluate():
 # ----------------------------------------------------------
 @app.get("/health")
 def health():
-    return {"status": "running"}
+    return {
+        "status": "running",
+        "llm_cache": llm_cache_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "jobs": jobs.stats()
+    }
 
 
 # ----------------------------------------------------------
@@ -2,9 +2,10 @@
 import os
 from typing import Dict, Any
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 
+from src.llm import get_llm
 from src.web_search import duckduckgo_search
+from src.pipeline import StageGraph
 
 load_dotenv()
 
@@ -37,11 +38,7 @@ class MultiAgentSystem:
             raise ValueError("GROQ_API_KEY not found in environment.")
         self.strong_mode = strong_mode
         self.model = model
-        self.llm = ChatGroq(
-            model=self.model,
-            groq_api_key=GROQ_API_KEY,
-            max_tokens=max_tokens
-        )
+        self.llm = get_llm(self.model, max_tokens=max_tokens)
 
     # -------------------------
     # Engineer Agent
@@ -189,20 +186,24 @@ Output concise.
     # -------------------------
     # Policy Agent
     # -------------------------
-    def policy_agent(self, dpr_context: str) -> str:
+    def policy_agent(self, dpr_context: str, compliance_evidence: str | None = None) -> str:
+        """`compliance_evidence` is ComplianceChecker.format_evidence() of the DPR's rule scan."""
         ctx = _trim(dpr_context)
+        evidence = _trim(compliance_evidence, chars=1400) if compliance_evidence else ""
         if self.strong_mode:
-            # probe scheme-specific checks
-            web = duckduckgo_search("PMGSY DPR guidelines format MoRTH DPR checklist", max_results=5)
-            web_ctx = "\n".join(web)[:900]
+            if evidence:
+                refs = f"Rule-based scheme checks (page evidence from the DPR):\n{evidence}"
+            else:
+                # probe scheme-specific checks
+                web = duckduckgo_search("PMGSY DPR guidelines format MoRTH DPR checklist", max_results=5)
+                refs = "Scheme references:\n" + "\n".join(web)[:900]
             prompt = f"""
 You are a Government Policy & Compliance Specialist.
 
 DPR excerpt:
 {ctx}
 
-Scheme references:
-{web_ctx}
+{refs}
 
 Tasks:
 - Check DPR alignment with PMGSY/AMRUT/JJM/Smart Cities/MoRTH where applicable.
@@ -219,6 +220,9 @@ You are a Policy Analyst.
 DPR excerpt:
 {ctx}
 
+Rule-based scheme checks:
+{evidence or "Not available."}
+
 Tasks:
 - Identify any obvious policy or compliance gaps.
 - Provide a short compliance score (1-10).
@@ -266,34 +270,54 @@ Keep output concise and actionable.
         return f"Reviewer Agent Output:\n{resp}"
 
     # -------------------------
-    # High-level helper: run all agents and return consolidated result
+    # Stage wiring: lets callers schedule the agents inside a larger StageGraph
     # -------------------------
-    def run_full_evaluation(self, dpr_text: str, monte_carlo_summary: Dict[str, Any] | None = None) -> str:
+    def add_stages(self, graph: StageGraph, dpr_text: str, monte_carlo_stage: str | None = None,
+                   compliance_stage: str | None = None, prefix: str = "agent:") -> str:
         """
-        Runs all agents sequentially (engineer, finance, risk, policy) and then the reviewer.
-        Returns a combined textual summary.
+        Declare the agent panel as stages of `graph`.
+
+        Engineer and finance agents are independent; the risk agent waits
+        on `monte_carlo_stage` and the policy agent on `compliance_stage`
+        (evidence text) if given; the reviewer waits on all four.
+        Returns the name of the stage that yields the formatted panel text.
         """
+        context = self.panel_context(dpr_text)
+
+        eng = graph.add(f"{prefix}engineer", lambda: self.engineer_agent(context))
+        fin = graph.add(f"{prefix}finance", lambda: self.finance_agent(context))
+        if compliance_stage:
+            pol = graph.add(
+                f"{prefix}policy",
+                lambda **deps: self.policy_agent(context, compliance_evidence=deps[compliance_stage]),
+                deps=[compliance_stage]
+            )
+        else:
+            pol = graph.add(f"{prefix}policy", lambda: self.policy_agent(context))
+
+        if monte_carlo_stage:
+            risk = graph.add(
+                f"{prefix}risk",
+                lambda **deps: self.risk_agent(context, monte_carlo_summary=deps[monte_carlo_stage]),
+                deps=[monte_carlo_stage]
+            )
+        else:
+            risk = graph.add(f"{prefix}risk", lambda: self.risk_agent(context))
+
+        def review(**deps):
+            outs = (deps[eng], deps[fin], deps[risk], deps[pol])
+            return self.format_panel(*outs, self.reviewer_agent(*outs))
+
+        return graph.add(f"{prefix}panel", review, deps=[eng, fin, risk, pol])
+
+    @staticmethod
+    def panel_context(dpr_text: str) -> str:
+        """The DPR text the agent panel actually sees."""
         # Use trimmed full context for speed
-        context = _trim(dpr_text, chars=3000)
-
-        # Run agents
-        eng = self.engineer_agent(context)
-        fin = self.finance_agent(context)
-        risk = self.risk_agent(context, monte_carlo_summary=monte_carlo_summary)
-        pol = self.policy_agent(context)
-
-        # Final aggregate
-        review = self.reviewer_agent(eng, fin, risk, pol)
-
-        # Return a composite structure
-        out = {
-            "engineer": eng,
-            "finance": fin,
-            "risk": risk,
-            "policy": pol,
-            "reviewer": review
-        }
+        return _trim(dpr_text, chars=3000)
 
+    @staticmethod
+    def format_panel(eng: str, fin: str, risk: str, pol: str, review: str) -> str:
         # Format compactly for insertion into final prompt
         formatted = "\n\n--- AGENT PANEL ---\n"
         formatted += f"Engineer:\n{eng}\n\n"
@@ -302,3 +326,20 @@ Keep output concise and actionable.
         formatted += f"Policy:\n{pol}\n\n"
         formatted += f"Reviewer:\n{review}\n"
         return formatted
+
+    # -------------------------
+    # High-level helper: run all agents and return consolidated result
+    # -------------------------
+    def run_full_evaluation(self, dpr_text: str, monte_carlo_summary: Dict[str, Any] | None = None) -> str:
+        """
+        Runs the four specialist agents concurrently, then the reviewer.
+        Returns a combined textual summary.
+        """
+        graph = StageGraph(max_workers=4)
+        mc_stage = None
+        if monte_carlo_summary:
+            mc_stage = graph.add("monte_carlo", lambda: monte_carlo_summary)
+
+        panel = self.add_stages(graph, dpr_text, monte_carlo_stage=mc_stage)
+        results, _ = graph.run()
+        return results[panel]
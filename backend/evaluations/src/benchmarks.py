@@ -1,6 +1,61 @@
-from src.web_search import duckduckgo_search
+import os
+import numpy as np
+
+from src.sor_database import SORDatabase, get_sor_database
+
+# BOQ rates at least this far (in %) from the SOR rate are reported
+SOR_DEVIATION_PCT = float(os.getenv("SOR_DEVIATION_PCT", "20"))
+SOR_MAX_REPORTED = int(os.getenv("SOR_MAX_REPORTED", "15"))
+
 
 class CostBenchmarkEngine:
-    def benchmark(self, project_type, dpr_cost):
-        results = duckduckgo_search(f"{project_type} India CPWD PWD", max_results=3)
-        return {"benchmarks": results, "dpr_cost": dpr_cost}
+    """
+    Item-level cost benchmarking against the offline schedule-of-rates
+    database (src/sor_database.py). Deterministic and fully offline.
+    """
+
+    def __init__(self, db: SORDatabase | None = None):
+        self._db = db
+
+    @property
+    def db(self) -> SORDatabase:
+        return self._db if self._db is not None else get_sor_database()
+
+    def benchmark(self, project_type, dpr_cost, boq_items=None):
+        db = self.db
+        result = {"project_type": project_type, "dpr_cost": dpr_cost, "sor_items": len(db)}
+        if not len(db):
+            result["note"] = "No schedule-of-rates data loaded (set SOR_PATH)"
+            return result
+
+        boq_items = boq_items or []
+        rows = db.compare(boq_items)
+
+        # value of the matched items at BOQ rates vs at SOR rates
+        qty = np.array([it.get("qty", np.nan) for it in boq_items], dtype=np.float64)
+        rate = np.array([r["rate"] if r["rate"] is not None else np.nan for r in rows], dtype=np.float64)
+        sor_rate = np.array([r["sor_rate"] if r.get("unit_match") else np.nan for r in rows], dtype=np.float64)
+        priced = ~np.isnan(qty) & ~np.isnan(rate) & ~np.isnan(sor_rate)
+        boq_value = float(np.sum(qty[priced] * rate[priced]))
+        sor_value = float(np.sum(qty[priced] * sor_rate[priced]))
+
+        deltas = np.array([r["delta_pct"] for r in rows if r.get("delta_pct") is not None], dtype=np.float64)
+        deviations = sorted(
+            (r for r in rows if r.get("delta_pct") is not None and abs(r["delta_pct"]) >= SOR_DEVIATION_PCT),
+            key=lambda r: -abs(r["delta_pct"])
+        )
+
+        result.update({
+            "items_compared": len(rows),
+            "items_matched": sum(1 for r in rows if "sor_code" in r),
+            "items_rate_compared": int(deltas.size),
+            "median_delta_pct": round(float(np.median(deltas)), 2) if deltas.size else None,
+            "matched_boq_value": round(boq_value, 2),
+            "matched_sor_value": round(sor_value, 2),
+            "value_delta_pct": round((boq_value - sor_value) / sor_value * 100.0, 2) if sor_value else None,
+            "deviations": [
+                {k: r.get(k) for k in ("desc", "unit", "rate", "sor_code", "sor_rate", "delta_pct", "page")}
+                for r in deviations[:SOR_MAX_REPORTED]
+            ]
+        })
+        return result
@@ -0,0 +1,139 @@
+# src/boq_benchmark.py
+"""
+Tokenizer vs regex BOQ parser: parity check and throughput benchmark.
+
+Generates a synthetic BOQ (all line shapes the parser understands, plus
+prose and long number-heavy lines that make the regexes backtrack),
+checks that parse_boq_from_text returns exactly the items of the
+reference parse_boq_from_text_regex, including a fixed corpus of edge
+cases, then times both.
+
+    python -m src.boq_benchmark --lines 100000
+"""
+import math
+import time
+import random
+import argparse
+
+from src.boq_parser import parse_boq_from_text, parse_boq_from_text_regex
+
+# Hand-picked lines covering every branch of the parser (golden corpus):
+# the tokenizer must agree with the regex path on all of them.
+EDGE_CASES = [
+    "Earthwork in excavation - 200 cum @ 150.00 = 30000",
+    "Earthwork in excavation - 200 cum @ 150.00",
+    "Earthwork - 200cum@150=30000",
+    "PCC 1:4:8 - 12.5 m3 @ 4,500 = 56,250",
+    "Sub-base - GSB - 1,200 sqm @ 95 ₹ 1,14,000",
+    "Item - x - 5 kg @ 3 =",
+    "- 5 kg @ 3",
+    "1. Earthwork: 200 m3 @ 150.00 = 30000",
+    "1. Earthwork: 200 cum @ 150.00 = 30000",
+    "12. Steel: reinforcement: 2,000 kg @ 65 = 1,30,000",
+    "Clause 3.2. Shuttering: 400 sqm @ 300",
+    "1. : 5 kg @ 3",
+    "7.  : 5 kg @ 3 = 15",
+    "Brick masonry 1:6 450 sqm 820 369000",
+    "Brick masonry 450 sqm 820",
+    "a  5 kg 3 15",
+    "a 5 kg 3 15",
+    "R.C.C. M25 grade 35.5 cum 7,450.00 2,64,475.00",
+    "Sub-total : ₹ 1,23,456.00",
+    "Contingencies - 3%",
+    "Total cost: 4,50,00,000",
+    "GST @ 18% : 81,00,000",
+    "The contractor shall complete the works within 18 months.",
+    "Rate analysis as per CPWD DSR 2023",
+    "...",
+    "१२. Earthwork: २०० cum @ १५० = ३००००",
+    "Earthwork - 200 cum @ 150",
+]
+
+UNITS = ["cum", "sqm", "kg", "nos", "rm", "MT", "m3", "LS", "%"]
+WORDS = ("earthwork excavation concrete reinforcement steel shuttering brick masonry plaster "
+         "bituminous macadam culvert drain sub-base granular providing laying compacting").split()
+
+
+def _num(rng: random.Random) -> str:
+    v = rng.uniform(1, 10 ** rng.randint(1, 6))
+    return f"{v:,.2f}" if rng.random() < 0.5 else str(int(v))
+
+
+def _desc(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 8)))
+
+
+def synthetic_boq(n_lines: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n_lines):
+        r = rng.random()
+        if r < 0.25:
+            lines.append(f"{_desc(rng)} - {_num(rng)} {rng.choice(UNITS)} @ {_num(rng)} = {_num(rng)}")
+        elif r < 0.45:
+            lines.append(f"{i + 1}. {_desc(rng)}: {_num(rng)} {rng.choice(UNITS)} @ {_num(rng)}")
+        elif r < 0.65:
+            lines.append(f"{_desc(rng)} {_num(rng)} {rng.choice(UNITS)} {_num(rng)} {_num(rng)}")
+        elif r < 0.75:
+            lines.append(f"{_desc(rng).capitalize()} total : ₹ {_num(rng)}")
+        elif r < 0.90:
+            lines.append(f"The {_desc(rng)} shall conform to clause {rng.randint(1, 40)}.{rng.randint(1, 9)} of MoRTH.")
+        else:
+            # long number-heavy rows (abstracts, merged table cells): worst case for the regexes
+            cells = [_num(rng) for _ in range(rng.randint(20, 60))]
+            lines.append(" - ".join(" ".join(cells[j:j + 3]) for j in range(0, len(cells), 3)) + " cum")
+    return "\n".join(lines)
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def mismatches(text: str):
+    new, ref = parse_boq_from_text(text), parse_boq_from_text_regex(text)
+    if len(new) != len(ref):
+        return [("item count", len(new), len(ref))]
+    return [(i, n, r) for i, (n, r) in enumerate(zip(new, ref))
+            if n.keys() != r.keys() or not all(_same(n[k], r[k]) for k in n)]
+
+
+def timed(fn, text: str):
+    t = time.perf_counter()
+    items = fn(text)
+    return items, time.perf_counter() - t
+
+
+def run(n_lines: int, seed: int):
+    # golden corpus, line by line so a failure names the line
+    bad = []
+    for line in EDGE_CASES:
+        bad += [(line,) + m for m in mismatches(line)]
+    print(f"[INFO] Edge cases: {len(EDGE_CASES) - len(bad)}/{len(EDGE_CASES)} match the regex parser")
+    for m in bad:
+        print(f"[ERROR] {m}")
+
+    text = synthetic_boq(n_lines, seed)
+    print(f"[INFO] Synthetic BOQ: {n_lines} lines, {len(text) / 1e6:.1f} MB")
+
+    diff = mismatches(text)
+    print(f"[INFO] Synthetic parity: {'OK' if not diff else f'{len(diff)} mismatches'}")
+    for m in diff[:5]:
+        print(f"[ERROR] {m}")
+
+    new_items, new_s = timed(parse_boq_from_text, text)
+    ref_items, ref_s = timed(parse_boq_from_text_regex, text)
+    print(f"\n{'parser':<12}{'items':>9}{'seconds':>10}{'lines/s':>12}")
+    print(f"{'regex':<12}{len(ref_items):>9}{ref_s:>10.2f}{n_lines / ref_s:>12,.0f}")
+    print(f"{'tokenizer':<12}{len(new_items):>9}{new_s:>10.2f}{n_lines / new_s:>12,.0f}")
+    print(f"speedup: {ref_s / new_s:.1f}x")
+    return not bad and not diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.lines, args.seed) else 1)
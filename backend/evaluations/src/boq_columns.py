@@ -0,0 +1,184 @@
+# src/boq_columns.py
+import os
+import numpy as np
+from typing import Any, Dict, List
+
+# |qty x rate - amount| above this fraction of the amount is a mismatch
+BOQ_MISMATCH_TOL = float(os.getenv("BOQ_MISMATCH_TOL", "0.01"))
+# modified z-score above which a rate is an outlier within its unit
+BOQ_OUTLIER_Z = float(os.getenv("BOQ_OUTLIER_Z", "3.5"))
+# units with fewer priced items than this are not scored
+BOQ_MIN_UNIT_ITEMS = int(os.getenv("BOQ_MIN_UNIT_ITEMS", "4"))
+# flagged items reported in the summary (worst first)
+BOQ_MAX_FLAGGED = int(os.getenv("BOQ_MAX_FLAGGED", "25"))
+# largest items simulated individually by the Monte Carlo stage; the rest form one head
+BOQ_COST_HEADS = int(os.getenv("BOQ_COST_HEADS", "10"))
+
+
+def _value(x) -> Any:
+    """JSON-safe float (None for NaN)."""
+    return None if np.isnan(x) else float(x)
+
+
+def _group_median(values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of each group of an array already sorted within groups."""
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    return (values[lo] + values[hi]) / 2.0
+
+
+class BOQTable:
+    """
+    Columnar BOQ: one NumPy array per field instead of a list of dicts.
+
+        desc_id  int32   index into `descriptions`
+        qty      float64 NaN when missing
+        unit     int32   index into `units` (normalised, lower-case)
+        rate     float64
+        amount   float64
+        page     int32   -1 when unknown
+
+    Totals, missing-field masks, qty x rate vs amount mismatches and
+    per-unit rate outliers are computed in vectorized passes.
+    """
+
+    def __init__(self, descriptions: List[str], desc_id: np.ndarray, units: List[str], unit: np.ndarray,
+                 qty: np.ndarray, rate: np.ndarray, amount: np.ndarray, page: np.ndarray):
+        self.descriptions = descriptions
+        self.desc_id = desc_id
+        self.units = units
+        self.unit = unit
+        self.qty = qty
+        self.rate = rate
+        self.amount = amount
+        self.page = page
+
+    @classmethod
+    def from_items(cls, items: List[Dict[str, Any]]) -> "BOQTable":
+        desc_index: Dict[str, int] = {}
+        unit_index: Dict[str, int] = {}
+        n = len(items)
+        desc_id = np.empty(n, dtype=np.int32)
+        unit = np.empty(n, dtype=np.int32)
+        page = np.full(n, -1, dtype=np.int32)
+        qty, rate, amount = (np.empty(n, dtype=np.float64) for _ in range(3))
+
+        for i, it in enumerate(items):
+            desc_id[i] = desc_index.setdefault(it.get("desc") or "", len(desc_index))
+            unit[i] = unit_index.setdefault((it.get("unit") or "").strip().lower(), len(unit_index))
+            qty[i] = it.get("qty", np.nan)
+            rate[i] = it.get("rate", np.nan)
+            amount[i] = it.get("amount", np.nan)
+            if it.get("page") is not None:
+                page[i] = it["page"]
+
+        return cls(list(desc_index), desc_id, list(unit_index), unit, qty, rate, amount, page)
+
+    def __len__(self):
+        return len(self.qty)
+
+    def item(self, i: int) -> Dict[str, Any]:
+        return {
+            "desc": self.descriptions[self.desc_id[i]],
+            "qty": _value(self.qty[i]),
+            "unit": self.units[self.unit[i]],
+            "rate": _value(self.rate[i]),
+            "amount": _value(self.amount[i]),
+            "page": int(self.page[i]) if self.page[i] >= 0 else None
+        }
+
+    # -------------------------
+    # Vectorized checks
+    # -------------------------
+    def mismatch_gap(self) -> np.ndarray:
+        """qty x rate - amount where all three are present, else NaN."""
+        return self.qty * self.rate - self.amount
+
+    def mismatches(self, tol: float = BOQ_MISMATCH_TOL) -> np.ndarray:
+        gap = np.abs(self.mismatch_gap())
+        with np.errstate(invalid="ignore"):
+            return gap > np.maximum(tol * np.abs(self.amount), 1.0)
+
+    def rate_zscores(self, min_items: int = BOQ_MIN_UNIT_ITEMS) -> np.ndarray:
+        """
+        Modified z-score of each rate within its unit group:
+        0.6745 * (rate - median) / MAD, with 1.2533 * mean absolute
+        deviation when MAD is 0. NaN for unpriced items and small groups.
+        """
+        z = np.full(len(self), np.nan)
+        idx = np.flatnonzero(~np.isnan(self.rate))
+        if idx.size == 0:
+            return z
+
+        codes, rates = self.unit[idx], self.rate[idx]
+        order = np.lexsort((rates, codes))
+        codes, rates, idx = codes[order], rates[order], idx[order]
+
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        counts = np.diff(np.r_[starts, codes.size])
+        group = np.repeat(np.arange(starts.size), counts)
+
+        med = _group_median(rates, starts, counts)
+        dev = np.abs(rates - med[group])
+
+        # sort deviations within each group for the MAD
+        dev_sorted = dev[np.lexsort((dev, group))]
+        mad = _group_median(dev_sorted, starts, counts)
+        mean_ad = np.add.reduceat(dev, starts) / counts
+
+        scale = np.where(mad > 0, mad / 0.6745, mean_ad * 1.253314)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(scale[group] > 0, (rates - med[group]) / scale[group], 0.0)
+        scores[counts[group] < min_items] = np.nan
+        z[idx] = scores
+        return z
+
+    def cost_heads(self, max_heads: int = BOQ_COST_HEADS) -> List[Dict[str, Any]]:
+        """The `max_heads` largest priced items plus one "Other items" head for the remainder."""
+        amount = np.where(np.isnan(self.amount), 0.0, self.amount)
+        order = np.argsort(-amount, kind="stable")
+        top = [i for i in order[:max_heads] if amount[i] > 0]
+        heads = [{"desc": self.descriptions[self.desc_id[i]], "amount": float(amount[i])} for i in top]
+        rest = float(amount.sum() - sum(h["amount"] for h in heads))
+        if rest > 0:
+            heads.append({"desc": "Other items", "amount": rest})
+        return heads
+
+    # -------------------------
+    # Summary
+    # -------------------------
+    def summary(self, max_flagged: int = BOQ_MAX_FLAGGED) -> Dict[str, Any]:
+        missing_qty = np.isnan(self.qty)
+        missing_rate = np.isnan(self.rate)
+        missing_amount = np.isnan(self.amount)
+
+        mismatch = self.mismatches()
+        z = self.rate_zscores()
+        with np.errstate(invalid="ignore"):
+            outlier = np.abs(z) > BOQ_OUTLIER_Z
+
+        gap = self.mismatch_gap()
+        flagged = []
+        for i in np.flatnonzero(mismatch):
+            rel = abs(gap[i]) / max(abs(self.amount[i]), 1.0)
+            flagged.append((rel, i, "amount_mismatch",
+                            f"qty x rate = {self.qty[i] * self.rate[i]:,.2f} but amount = {self.amount[i]:,.2f}"))
+        for i in np.flatnonzero(outlier):
+            flagged.append((abs(z[i]) / BOQ_OUTLIER_Z, i, "rate_outlier",
+                            f"rate {self.rate[i]:,.2f} per {self.units[self.unit[i]] or 'unit'} (robust z = {z[i]:+.1f})"))
+        flagged.sort(key=lambda f: -f[0])
+
+        return {
+            "items_count": len(self),
+            "total_estimated_cost": round(float(np.nansum(self.amount)), 2),
+            "missing_rate_count": int(missing_rate.sum()),
+            "missing_qty_count": int(missing_qty.sum()),
+            "missing_amount_count": int(missing_amount.sum()),
+            "amount_mismatch_count": int(mismatch.sum()),
+            "rate_outlier_count": int(outlier.sum()),
+            "flagged_items": [
+                {**self.item(i), "flag": kind, "detail": detail}
+                for _, i, kind, detail in flagged[:max_flagged]
+            ],
+            "cost_heads": self.cost_heads()
+        }
@@ -3,6 +3,8 @@ import re
 from typing import List, Dict, Any
 import math
 
+from src.boq_columns import BOQTable
+
 BOQ_ITEM_PATTERNS = [
     # common patterns: "Item description - qty unit @ rate = amount"
     re.compile(r'(?P<desc>[\w\W]+?)\s*-\s*(?P<qty>[\d,\.]+)\s*(?P<unit>[a-zA-Z/%]+)\s*@\s*(?P<rate>[\d,.,]+)\s*(?:=|₹)?\s*(?P<amount>[\d,.,]+)?'),
@@ -12,6 +14,12 @@ BOQ_ITEM_PATTERNS = [
     re.compile(r'(?P<desc>[A-Za-z][\w\W]+?)\s+(?P<qty>[\d,\.]+)\s+(?P<unit>[a-zA-Z/%]+)\s+(?P<rate>[\d,.,]+)\s+(?P<amount>[\d,.,]+)')
 ]
 
+# Section titles / headers that introduce a BOQ
+BOQ_SECTION_HEADERS = ["bill of quantities", "boq", "bill of items", "schedule of quantities", "bill of quantities (boq)"]
+
+# "Description : Rs xxx" style lines
+BOQ_AMOUNT_PATTERN = re.compile(r'(?P<desc>.+?)\s*[:\-]\s*₹?\s*(?P<amount>[\d,\.]+)')
+
 def _clean_num(s: str) -> float:
     if s is None:
         return math.nan
@@ -21,10 +29,24 @@ def _clean_num(s: str) -> float:
     except:
         return math.nan
 
-def parse_boq_from_text(text: str) -> List[Dict[str, Any]]:
+def _item(desc, qty, unit, rate, amount) -> Dict[str, Any]:
+    item = {
+        "desc": (desc or "").strip(),
+        "qty": _clean_num(qty),
+        "unit": (unit or "").strip(),
+        "rate": _clean_num(rate),
+        "amount": _clean_num(amount)
+    }
+    # If amount missing but qty & rate exist compute it
+    if math.isnan(item["amount"]) and not math.isnan(item["qty"]) and not math.isnan(item["rate"]):
+        item["amount"] = round(item["qty"] * item["rate"], 2)
+    return item
+
+def parse_boq_from_text_regex(text: str) -> List[Dict[str, Any]]:
     """
-    Parse BOQ-like lines from free text into structured items.
-    Returns list of items: {desc, qty, unit, rate, amount}
+    Reference implementation of parse_boq_from_text using BOQ_ITEM_PATTERNS.
+    Can backtrack heavily on long, number-heavy lines; kept for parity
+    checks and benchmarks (see src/boq_benchmark.py).
     """
     lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
     items = []
@@ -34,60 +56,214 @@ def parse_boq_from_text(text: str) -> List[Dict[str, Any]]:
             m = pat.search(ln)
             if m:
                 gd = m.groupdict()
-                item = {
-                    "desc": (gd.get("desc") or "").strip(),
-                    "qty": _clean_num(gd.get("qty")),
-                    "unit": (gd.get("unit") or "").strip(),
-                    "rate": _clean_num(gd.get("rate")),
-                    "amount": _clean_num(gd.get("amount"))
-                }
-                # If amount missing but qty & rate exist compute it
-                if math.isnan(item["amount"]) and not math.isnan(item["qty"]) and not math.isnan(item["rate"]):
-                    item["amount"] = round(item["qty"] * item["rate"], 2)
-                items.append(item)
+                items.append(_item(gd.get("desc"), gd.get("qty"), gd.get("unit"), gd.get("rate"), gd.get("amount")))
                 matched = True
                 break
         # Optionally try to capture "Description : Rs xxx" style lines
         if not matched:
             # try "desc : amount" style
-            m2 = re.match(r'(?P<desc>.+?)\s*[:\-]\s*₹?\s*(?P<amount>[\d,\.]+)', ln)
+            m2 = BOQ_AMOUNT_PATTERN.match(ln)
             if m2:
                 gd = m2.groupdict()
                 amt = _clean_num(gd.get("amount"))
                 items.append({"desc": gd.get("desc").strip(), "qty": math.nan, "unit": "", "rate": math.nan, "amount": amt})
     return items
 
+# ------------------------------------------------------------------
+# Single-pass tokenizer parser
+#
+# Each BOQ_ITEM_PATTERNS entry is "free-text description, separator,
+# numeric tail". The description is the only part the regexes backtrack
+# over, and the tail classes (digits/,/. ; unit letters ; whitespace)
+# never contain the separator, so trying the separators left to right
+# and scanning the tail forward once gives the same match as the regex
+# in O(len(line)) per line.
+# ------------------------------------------------------------------
+_UNIT_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ/%")
+
+def _is_num(c: str) -> bool:
+    return c.isdecimal() or c == "," or c == "."
+
+def _skip_ws(s: str, i: int) -> int:
+    n = len(s)
+    while i < n and s[i].isspace():
+        i += 1
+    return i
+
+def _skip_num(s: str, i: int) -> int:
+    n = len(s)
+    while i < n and _is_num(s[i]):
+        i += 1
+    return i
+
+def _skip_unit(s: str, i: int) -> int:
+    n = len(s)
+    while i < n and s[i] in _UNIT_CHARS:
+        i += 1
+    return i
+
+def _rate_tail(s: str, i: int):
+    """`qty unit @ rate [=|₹] [amount]` from i, whitespace optional; (qty, unit, rate, amount) or None."""
+    i = _skip_ws(s, i)
+    q = _skip_num(s, i)
+    if q == i:
+        return None
+    qty, i = s[i:q], _skip_ws(s, q)
+    u = _skip_unit(s, i)
+    if u == i:
+        return None
+    unit, i = s[i:u], _skip_ws(s, u)
+    if i >= len(s) or s[i] != "@":
+        return None
+    i = _skip_ws(s, i + 1)
+    r = _skip_num(s, i)
+    if r == i:
+        return None
+    rate, i = s[i:r], _skip_ws(s, r)
+    if i < len(s) and s[i] in "=₹":
+        i = _skip_ws(s, i + 1)
+    a = _skip_num(s, i)
+    return qty, unit, rate, (s[i:a] if a > i else None)
+
+def _column_tail(s: str, i: int):
+    """`qty unit rate amount` from i, whitespace required between; (qty, unit, rate, amount) or None."""
+    fields = []
+    for skip in (_skip_num, _skip_unit, _skip_num, _skip_num):
+        if fields:
+            w = _skip_ws(s, i)
+            if w == i:
+                return None
+            i = w
+        end = skip(s, i)
+        if end == i:
+            return None
+        fields.append(s[i:end])
+        i = end
+    return tuple(fields)
+
+def _parse_dash(s: str):
+    # "desc - qty unit @ rate = amount"
+    k = s.find("-", 1)
+    while k != -1:
+        tail = _rate_tail(s, k + 1)
+        if tail:
+            return (s[:k],) + tail
+        k = s.find("-", k + 1)
+    return None
+
+def _parse_numbered(s: str):
+    # "1. desc: qty unit @ rate = amount"; only the first "<digits>." can start a match
+    n, i = len(s), 0
+    while i < n:
+        if s[i].isdecimal():
+            j = i
+            while j < n and s[j].isdecimal():
+                j += 1
+            if j < n and s[j] == ".":
+                break
+            i = j
+        else:
+            i += 1
+    else:
+        return None
+
+    d0 = j + 1
+    d1 = _skip_ws(s, d0)
+    k = s.find(":", d1 + 1)
+    while k != -1:
+        tail = _rate_tail(s, k + 1)
+        if tail:
+            return (s[d1:k],) + tail
+        k = s.find(":", k + 1)
+    # the regex may give one whitespace char back to the description
+    if d1 > d0 and d1 < n and s[d1] == ":":
+        tail = _rate_tail(s, d1 + 1)
+        if tail:
+            return (s[d1 - 1:d1],) + tail
+    return None
+
+def _parse_columns(s: str):
+    # "desc qty unit rate amount"; description starts at the first ASCII letter
+    start = next((i for i, c in enumerate(s) if c in _UNIT_CHARS and c.isalpha()), None)
+    if start is None:
+        return None
+    n, i = len(s), start + 1
+    while i < n:
+        if not s[i].isspace():
+            i += 1
+            continue
+        run_end = _skip_ws(s, i)
+        # the description is at least two characters long
+        if max(i, start + 2) < run_end:
+            tail = _column_tail(s, run_end)
+            if tail:
+                return (s[start:i],) + tail
+        i = run_end
+    return None
+
+def _parse_amount(s: str):
+    # "desc : amount" / "desc - ₹ amount"
+    n = len(s)
+    for k in range(1, n):
+        if s[k] != ":" and s[k] != "-":
+            continue
+        i = _skip_ws(s, k + 1)
+        if i < n and s[i] == "₹":
+            i = _skip_ws(s, i + 1)
+        a = _skip_num(s, i)
+        if a > i:
+            return s[:k], s[i:a]
+    return None
+
+def parse_line(ln: str):
+    """One stripped BOQ line -> item dict or None (same result as the regex path)."""
+    for parse in (_parse_dash, _parse_numbered, _parse_columns):
+        m = parse(ln)
+        if m:
+            return _item(*m)
+    m = _parse_amount(ln)
+    if m:
+        return {"desc": m[0].strip(), "qty": math.nan, "unit": "", "rate": math.nan, "amount": _clean_num(m[1])}
+    return None
+
+def parse_boq_from_text(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse BOQ-like lines from free text into structured items.
+    Returns list of items: {desc, qty, unit, rate, amount}
+
+    Linear time per line; produces the same items as
+    parse_boq_from_text_regex.
+    """
+    items = []
+    for ln in text.splitlines():
+        ln = ln.strip()
+        if ln:
+            item = parse_line(ln)
+            if item is not None:
+                items.append(item)
+    return items
+
 def boq_summary(items: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
-    Return totals and basic flags.
+    Return totals and basic flags, plus amount mismatches and per-unit
+    rate outliers (see BOQTable.summary).
     """
-    total = 0.0
-    missing_rate_count = 0
-    missing_qty_count = 0
-    for it in items:
-        amt = it.get("amount", float('nan'))
-        if not (isinstance(amt, float) and math.isnan(amt)):
-            total += float(amt)
-        if math.isnan(it.get("rate", float('nan'))):
-            missing_rate_count += 1
-        if math.isnan(it.get("qty", float('nan'))):
-            missing_qty_count += 1
-
-    return {
-        "items_count": len(items),
-        "total_estimated_cost": round(total, 2),
-        "missing_rate_count": missing_rate_count,
-        "missing_qty_count": missing_qty_count
-    }
+    return BOQTable.from_items(items).summary()
 
 # Example helper to extract BOQ sections heuristically
-def extract_boq_sections(text: str, section_headers=None) -> str:
+def extract_boq_sections(text: str, section_headers=None, sections=None) -> str:
     """
     Attempt to find a BOQ / Bill of Quantities block in the DPR text.
-    Searches for common headers and returns that block as plain text.
+    With a SectionIndex (`sections`) the matching sections are sliced out
+    directly; otherwise searches for common headers and returns that
+    block as plain text.
     """
     if section_headers is None:
-        section_headers = ["bill of quantities", "boq", "bill of items", "schedule of quantities", "bill of quantities (boq)"]
+        section_headers = BOQ_SECTION_HEADERS
+    if sections is not None:
+        span = sections.text(text, section_headers)
+        if span.strip():
+            return span
     low = text.lower()
     for header in section_headers:
         idx = low.find(header)
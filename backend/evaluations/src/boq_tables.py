@@ -0,0 +1,173 @@
+# src/boq_tables.py
+import os
+import re
+import math
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+import fitz
+
+from src.boq_parser import BOQ_SECTION_HEADERS, _clean_num
+
+# Process pool for table detection (PyMuPDF is CPU-bound and not thread-parallel)
+BOQ_TABLE_WORKERS = int(os.getenv("BOQ_TABLE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# header cell keywords -> BOQ field, matched in this order (strongest keyword first)
+COLUMN_KEYWORDS = {
+    "desc": ["description", "particular", "item of work", "name of work", "item", "work"],
+    "qty": ["quantity", "qty", "qnty"],
+    "rate": ["rate", "unit cost", "unit price"],
+    "amount": ["amount", "total cost", "cost", "total", "value"],
+    "unit": ["unit", "uom"]
+}
+
+_TOTAL_ROW = re.compile(r"^\s*(sub[\s-]*total|grand\s+total|total)\b", re.I)
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?|\.\d+")
+_UNIT_TEXT = re.compile(r"[A-Za-z][A-Za-z./%\d]*")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def find_boq_pages(document, sections=None) -> List[int]:
+    """
+    Pages that may hold BOQ tables: the pages of BOQ sections in the
+    SectionIndex, else pages mentioning a BOQ header or both quantity
+    and rate columns.
+    """
+    if sections is not None:
+        pages = set()
+        for s in sections.find(BOQ_SECTION_HEADERS):
+            pages.update(range(s.page_start, s.page_end + 1))
+        if pages:
+            return sorted(pages)
+
+    pages = []
+    for p, text in enumerate(document.pages):
+        low = text.lower()
+        if any(h in low for h in BOQ_SECTION_HEADERS) or (("qty" in low or "quantity" in low) and "rate" in low):
+            pages.append(p)
+    return pages
+
+
+def _page_tables(args) -> List[List[List[str]]]:
+    """Worker: raw cell text of every table on one page."""
+    path, page_no = args
+    pdf = fitz.open(path)
+    try:
+        page = pdf[page_no]
+        # ruled tables first; whitespace-aligned tables via word positions
+        tables = page.find_tables().tables or page.find_tables(strategy="text").tables
+        return [
+            [[" ".join((cell or "").split()) for cell in row] for row in table.extract()]
+            for table in tables
+        ]
+    finally:
+        pdf.close()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the API process runs threads, forking it is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=BOQ_TABLE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _column_map(row: List[str]) -> Optional[Dict[str, int]]:
+    """Header row -> {field: column}; None unless it names a description and two numeric columns."""
+    cols: Dict[str, int] = {}
+    low = [cell.lower() for cell in row]
+    for field, keywords in COLUMN_KEYWORDS.items():
+        cols_taken = set(cols.values())
+        c = next((c for k in keywords for c, cell in enumerate(low) if c not in cols_taken and k in cell), None)
+        if c is not None:
+            cols[field] = c
+    if "desc" in cols and sum(f in cols for f in ("qty", "rate", "amount")) >= 2:
+        return cols
+    return None
+
+
+def _cell_num(cell: str) -> float:
+    m = _NUMBER.search(cell or "")
+    return _clean_num(m.group(0)) if m else math.nan
+
+
+def _row_item(row: List[str], cols: Dict[str, int], page: int) -> Optional[Dict[str, Any]]:
+    def cell(field):
+        c = cols.get(field)
+        return row[c] if c is not None and c < len(row) else ""
+
+    desc = cell("desc")
+    qty, rate, amount = _cell_num(cell("qty")), _cell_num(cell("rate")), _cell_num(cell("amount"))
+    if math.isnan(qty) and math.isnan(rate) and math.isnan(amount):
+        return None
+    if _TOTAL_ROW.match(desc) and math.isnan(qty) and math.isnan(rate):
+        return None   # subtotals would be counted twice
+
+    unit = cell("unit")
+    if not unit:
+        # "200 cum" in the quantity cell
+        m = _UNIT_TEXT.search(cell("qty"))
+        unit = m.group(0) if m else ""
+
+    if math.isnan(amount) and not math.isnan(qty) and not math.isnan(rate):
+        amount = round(qty * rate, 2)
+    return {"desc": desc, "qty": qty, "unit": unit, "rate": rate, "amount": amount, "page": page}
+
+
+def extract_boq_tables(pdf_path: str, pages: List[int], workers: int = BOQ_TABLE_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Typed BOQ rows {desc, qty, unit, rate, amount, page} from the tables
+    on `pages`. Pages are processed in parallel on a process pool; a
+    table without its own header continues the previous BOQ table when
+    the column count matches (tables split across pages).
+    """
+    if not pages:
+        return []
+
+    jobs = [(pdf_path, p) for p in pages]
+    page_tables = None
+    if workers > 1 and len(jobs) > 1:
+        try:
+            page_tables = list(_get_pool().map(_page_tables, jobs))
+        except BrokenProcessPool as e:
+            print(f"[WARN] BOQ table pool failed ({e}); extracting in-process")
+            _reset_pool()
+    if page_tables is None:
+        page_tables = [_page_tables(j) for j in jobs]
+
+    items = []
+    cols, width = None, 0
+    for page, tables in zip(pages, page_tables):
+        for rows in tables:
+            start = 0
+            for i, row in enumerate(rows[:3]):
+                found = _column_map(row)
+                if found:
+                    cols, width, start = found, len(row), i + 1
+                    break
+            else:
+                if cols is None or not rows or len(rows[0]) != width:
+                    continue   # not a BOQ table
+
+            for row in rows[start:]:
+                item = _row_item(row, cols, page)
+                if item is not None:
+                    items.append(item)
+
+    print(f"[INFO] Extracted {len(items)} BOQ rows from tables on {len(pages)} pages")
+    return items
@@ -0,0 +1,189 @@
+# src/cache.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Root folder for all on-disk caches
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU with optional TTL (seconds).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None):
+        """`expires_at` (epoch seconds) caps the entry's lifetime below the cache TTL."""
+        expires = time.time() + self.ttl if self.ttl else None
+        if expires_at is not None:
+            expires = expires_at if expires is None else min(expires, expires_at)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Persistent key -> JSON value store backed by SQLite.
+
+    - entries older than `ttl` seconds are treated as missing and purged
+    - once more than `max_entries` rows exist, the least recently
+      accessed ones are evicted
+    Reads do not write: access times are buffered and flushed with the
+    next write (or every ACCESS_FLUSH hits).
+    Safe to share between threads and between worker processes (WAL).
+    """
+
+    ACCESS_FLUSH = 256
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._accessed: dict = {}   # key -> last access time, not yet written
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_accessed ON kv(accessed)")
+        self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_entry(self, key: str) -> Optional[tuple]:
+        """(value, created) for a live entry, else None. Expired rows are left to _evict."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM kv WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and created + self.ttl < now:
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= self.ACCESS_FLUSH:
+                self._flush_accessed()
+                self._conn.commit()
+        return json.loads(value), created
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE kv SET accessed = ? WHERE key = ?",
+                [(t, k) for k, t in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            self._writes += 1
+            # amortise eviction: only check every 64 writes
+            if self._writes % 64 == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM kv WHERE created < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM kv WHERE key IN "
+                "(SELECT key FROM kv ORDER BY accessed ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM kv")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+
+
+class TieredCache:
+    """
+    In-memory LRU in front of a persistent SQLiteCache.
+    Disk hits are promoted into memory for the rest of their disk lifetime.
+    """
+
+    def __init__(self, memory: LRUCache, disk: SQLiteCache):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return default
+        value, created = entry
+        expires_at = created + self.disk.ttl if self.disk.ttl is not None else None
+        self.memory.set(key, value, expires_at=expires_at)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
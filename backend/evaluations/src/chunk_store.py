@@ -0,0 +1,169 @@
+# src/chunk_store.py
+import os
+import json
+import numpy as np
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List
+
+SCHEMA_FILE = "chunks.json"
+
+# per-record state of a column in chunks.<col>.null.npy (written only if some record is not PRESENT)
+PRESENT, NULL, ABSENT = 0, 1, 2
+_ABSENT = object()
+
+
+def _blob_paths(directory: str, column: str):
+    return (
+        os.path.join(directory, f"chunks.{column}.bin"),
+        os.path.join(directory, f"chunks.{column}.offsets.npy")
+    )
+
+
+def _save_npy(path: str, arr: np.ndarray):
+    # write-then-rename so readers that already mmapped the old file keep a valid view
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, arr)
+    os.replace(path + ".tmp", path)
+
+
+def _null_path(directory: str, column: str) -> str:
+    return os.path.join(directory, f"chunks.{column}.null.npy")
+
+
+def _write_str_column(directory: str, column: str, values: List[str]):
+    blob_path, offsets_path = _blob_paths(directory, column)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(blob_path + ".tmp", "wb") as f:
+        pos = 0
+        for i, v in enumerate(values):
+            data = (v or "").encode("utf-8")
+            f.write(data)
+            pos += len(data)
+            offsets[i + 1] = pos
+    os.replace(blob_path + ".tmp", blob_path)
+    _save_npy(offsets_path, offsets)
+
+
+class ChunkStore(Sequence):
+    """
+    Columnar, memory-mapped store for chunk texts + metadata.
+
+    Layout inside `directory`:
+      chunks.json                  schema {column: "str" | "int" | "json"} + count
+      chunks.<col>.bin             concatenated UTF-8 (str columns; JSON text for json columns)
+      chunks.<col>.offsets.npy     int64 offsets, len = count + 1
+      chunks.<col>.npy             int64 values (int columns)
+      chunks.<col>.null.npy        uint8 PRESENT / NULL (None) / ABSENT (key not in
+                                   the record); only written when needed
+
+    Nothing is decoded up front: the files are mmapped and each record is
+    materialised only when indexed, so load time and resident memory do not
+    grow with corpus size. Records read back as the plain dicts that were
+    written, so the store is a drop-in for the old list-of-dicts metadata.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, SCHEMA_FILE), "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        self.count = schema["count"]
+        self.columns: Dict[str, str] = schema["columns"]
+        # stores written before the null arrays encoded None in int columns as -1
+        self._legacy = schema.get("version", 1) < 2
+
+        self._str = {}
+        self._int = {}
+        self._null = {}
+        for col, kind in self.columns.items():
+            null_path = _null_path(directory, col)
+            if os.path.exists(null_path):
+                self._null[col] = np.load(null_path, mmap_mode="r")
+            if kind in ("str", "json"):
+                blob_path, offsets_path = _blob_paths(directory, col)
+                # np.memmap refuses empty files
+                blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if os.path.getsize(blob_path) else np.zeros(0, np.uint8)
+                self._str[col] = (blob, np.load(offsets_path, mmap_mode="r"))
+            else:
+                self._int[col] = np.load(os.path.join(directory, f"chunks.{col}.npy"), mmap_mode="r")
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, SCHEMA_FILE))
+
+    @staticmethod
+    def write(directory: str, records: Iterable[Dict[str, Any]]):
+        """
+        Persist records (dicts with at least "text"). Integer-valued keys
+        become int columns, string-valued keys str columns, anything else
+        JSON; None values and missing keys are kept apart in a null array.
+        """
+        records = list(records)
+        os.makedirs(directory, exist_ok=True)
+
+        keys: List[str] = ["text"]
+        for r in records:
+            for k in r:
+                if k not in keys:
+                    keys.append(k)
+
+        columns = {}
+        for k in keys:
+            values = [r.get(k, _ABSENT) for r in records]
+            null = np.array([ABSENT if v is _ABSENT else NULL if v is None else PRESENT for v in values], dtype=np.uint8)
+            present = [v for v in values if v is not _ABSENT and v is not None]
+            if k != "text" and all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in present):
+                _save_npy(
+                    os.path.join(directory, f"chunks.{k}.npy"),
+                    np.array([v if s == PRESENT else 0 for v, s in zip(values, null)], dtype=np.int64)
+                )
+                columns[k] = "int"
+            elif all(isinstance(v, str) for v in present):
+                _write_str_column(directory, k, [v if s == PRESENT else "" for v, s in zip(values, null)])
+                columns[k] = "str"
+            else:
+                _write_str_column(directory, k, [json.dumps(v, default=str) if s == PRESENT else "" for v, s in zip(values, null)])
+                columns[k] = "json"
+
+            if null.any():
+                _save_npy(_null_path(directory, k), null)
+            elif os.path.exists(_null_path(directory, k)):
+                os.remove(_null_path(directory, k))
+
+        # schema last: a store is only visible once all columns are on disk
+        with open(os.path.join(directory, SCHEMA_FILE), "w", encoding="utf-8") as f:
+            json.dump({"version": 2, "count": len(records), "columns": columns}, f)
+
+    def text(self, i: int) -> str:
+        return self._get_str("text", i)
+
+    def _get_str(self, col: str, i: int) -> str:
+        blob, offsets = self._str[col]
+        start, end = int(offsets[i]), int(offsets[i + 1])
+        return bytes(blob[start:end]).decode("utf-8")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+
+        record: Dict[str, Any] = {}
+        for col, kind in self.columns.items():
+            state = int(self._null[col][i]) if col in self._null else PRESENT
+            if state == ABSENT:
+                continue
+            if state == NULL:
+                record[col] = None
+            elif kind == "int":
+                v = int(self._int[col][i])
+                record[col] = None if self._legacy and v == -1 else v
+            elif kind == "json":
+                record[col] = json.loads(self._get_str(col, i))
+            else:
+                record[col] = self._get_str(col, i)
+        return record
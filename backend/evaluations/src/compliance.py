@@ -1,17 +1,179 @@
-from src.web_search import duckduckgo_search
+# src/compliance.py
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.compliance_rules import SCHEME_RULES
+
+# evidence locations kept per rule
+MAX_EVIDENCE = 3
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton over word sequences.
+
+    Phrases are split into words and compiled into one trie with failure
+    links, so a single left-to-right pass over the text's words reports
+    every occurrence of every phrase, whatever the number of phrases.
+    Matching on words instead of characters gives whole-word matches for
+    free, and a word that occurs in no phrase sends the scan straight
+    back to the root.
+    """
+
+    def __init__(self, phrases: List[str]):
+        self.phrases = phrases
+        self._vocab: Dict[str, int] = {}
+        self._goto: List[Dict[int, int]] = [{}]
+        self._out: List[List[int]] = [[]]
+
+        for pid, phrase in enumerate(phrases):
+            state = 0
+            for word in _words(phrase):
+                wid = self._vocab.setdefault(word, len(self._vocab))
+                nxt = self._goto[state].get(wid)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][wid] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                state = nxt
+            if state:
+                self._out[state].append(pid)
+
+        # failure links, breadth first; outputs of the fail state are inherited
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for wid, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and wid not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(wid, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def scan(self, text: str) -> List[Tuple[int, int]]:
+        """(phrase id, char offset of the phrase's last word) for every match in `text`."""
+        vocab, goto, fail, out = self._vocab, self._goto, self._fail, self._out
+        matches = []
+        state = 0
+        for m in _WORD.finditer(text.lower()):
+            wid = vocab.get(m.group())
+            if wid is None:
+                state = 0
+                continue
+            while state and wid not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(wid, 0)
+            if out[state]:
+                matches.extend((pid, m.start()) for pid in out[state])
+        return matches
+
 
 class ComplianceChecker:
-    SCHEMES = [
-        "PMGSY guidelines",
-        "AMRUT DPR rules",
-        "Smart Cities DPR format",
-        "MoRTH standards",
-        "Jal Jeevan Mission guidelines",
-        "NEC DPR structure"
-    ]
-
-    def check(self, text):
-        return {
-            scheme: duckduckgo_search(f"{scheme}", max_results=2)
-            for scheme in self.SCHEMES
-        }
+    """
+    Scheme compliance from the DPR text alone: all rules in
+    src/compliance_rules.py are compiled into one PhraseAutomaton and
+    checked in a single pass, with page evidence for each rule met.
+    """
+
+    SCHEMES = list(SCHEME_RULES)
+
+    def __init__(self, rules: Dict[str, Any] = SCHEME_RULES):
+        self.rules = rules
+        phrases: List[str] = []
+        index: Dict[str, int] = {}
+        # (scheme, rule index or None for applicability) per phrase id
+        self._targets: List[List[Tuple[str, Optional[int]]]] = []
+
+        def add(phrase, target):
+            key = " ".join(_words(phrase))
+            if key not in index:
+                index[key] = len(phrases)
+                phrases.append(key)
+                self._targets.append([])
+            self._targets[index[key]].append(target)
+
+        for scheme, spec in rules.items():
+            for phrase in spec["detect"]:
+                add(phrase, (scheme, None))
+            for r, rule in enumerate(spec["rules"]):
+                for phrase in rule["any"]:
+                    add(phrase, (scheme, r))
+
+        self.automaton = PhraseAutomaton(phrases)
+
+    def check(self, text: str, page_offsets: Optional[List[int]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-scheme coverage of the DPR:
+            {scheme: {name, applicable, detected_by, coverage, met, total,
+                      rules: [{id, kind, label, met, evidence: [{page, phrase}]}],
+                      missing: [labels]}}
+        `page_offsets` (ExtractedDocument.page_offsets) maps matches to
+        0-based pages; without it evidence carries no page.
+        """
+        detected: Dict[str, List[str]] = {s: [] for s in self.rules}
+        evidence: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+
+        for pid, pos in self.automaton.scan(text or ""):
+            page = bisect_right(page_offsets, pos) - 1 if page_offsets else None
+            phrase = self.automaton.phrases[pid]
+            for scheme, r in self._targets[pid]:
+                if r is None:
+                    if phrase not in detected[scheme]:
+                        detected[scheme].append(phrase)
+                    continue
+                found = evidence.setdefault((scheme, r), [])
+                if len(found) < MAX_EVIDENCE and {"page": page, "phrase": phrase} not in found:
+                    found.append({"page": page, "phrase": phrase})
+
+        results = {}
+        for scheme, spec in self.rules.items():
+            rules = [
+                {
+                    "id": rule["id"],
+                    "kind": rule["kind"],
+                    "label": rule["label"],
+                    "met": (scheme, r) in evidence,
+                    "evidence": evidence.get((scheme, r), [])
+                }
+                for r, rule in enumerate(spec["rules"])
+            ]
+            met = sum(rule["met"] for rule in rules)
+            results[scheme] = {
+                "name": spec["name"],
+                "applicable": bool(detected[scheme]),
+                "detected_by": detected[scheme],
+                "coverage": round(met / len(rules), 2) if rules else 0.0,
+                "met": met,
+                "total": len(rules),
+                "rules": rules,
+                "missing": [rule["label"] for rule in rules if not rule["met"]]
+            }
+        return results
+
+    @staticmethod
+    def format_evidence(results: Dict[str, Dict[str, Any]]) -> str:
+        """Compact text of check() results for the policy agent (applicable schemes only)."""
+        lines = []
+        for scheme, res in results.items():
+            if not res["applicable"]:
+                continue
+            lines.append(f"{scheme} ({res['name']}): {res['met']}/{res['total']} rules met")
+            for rule in res["rules"]:
+                if rule["met"]:
+                    pages = sorted({e["page"] + 1 for e in rule["evidence"] if e["page"] is not None})
+                    where = f" [p.{', p.'.join(map(str, pages))}]" if pages else ""
+                    lines.append(f"  + {rule['label']}{where}")
+            for label in res["missing"]:
+                lines.append(f"  - MISSING: {label}")
+        return "\n".join(lines) or "No scheme-specific terms found in the DPR."
@@ -0,0 +1,136 @@
+# src/compliance_rules.py
+"""
+Declarative DPR compliance rules per scheme.
+
+    scheme -> {
+        "name":    full scheme name,
+        "detect":  phrases that make the scheme applicable to a DPR,
+        "rules":   [{"id", "kind", "label", "any": [phrases]}]
+    }
+
+kind is "section" (a chapter the DPR format requires), "approval" (a
+statutory clearance / sanction) or "keyword" (a scheme-specific item).
+A rule is met when any of its phrases occurs in the DPR; phrases are
+matched case-insensitively on whole words.
+"""
+
+SCHEME_RULES = {
+    "PMGSY": {
+        "name": "Pradhan Mantri Gram Sadak Yojana",
+        "detect": ["pmgsy", "pradhan mantri gram sadak", "rural road", "habitation connectivity"],
+        "rules": [
+            {"id": "pmgsy.core_network", "kind": "section", "label": "Core network / habitation connectivity",
+             "any": ["core network", "habitation", "unconnected habitation", "district rural road plan"]},
+            {"id": "pmgsy.traffic", "kind": "section", "label": "Traffic survey and CVPD",
+             "any": ["traffic survey", "traffic count", "cvpd", "commercial vehicles per day"]},
+            {"id": "pmgsy.soil", "kind": "section", "label": "Soil investigation / CBR",
+             "any": ["cbr", "california bearing ratio", "soil investigation", "soil test"]},
+            {"id": "pmgsy.pavement", "kind": "section", "label": "Pavement design (IRC:SP:72 / IRC:SP:20)",
+             "any": ["pavement design", "irc:sp:72", "irc:sp:20", "rural roads manual"]},
+            {"id": "pmgsy.drainage", "kind": "section", "label": "Cross drainage works",
+             "any": ["cross drainage", "culvert", "side drain"]},
+            {"id": "pmgsy.land", "kind": "approval", "label": "Land availability / gift deed",
+             "any": ["land availability", "gift deed", "land width", "no land acquisition"]},
+            {"id": "pmgsy.forest", "kind": "approval", "label": "Forest clearance",
+             "any": ["forest clearance", "forest land", "forest conservation act"]},
+            {"id": "pmgsy.maintenance", "kind": "keyword", "label": "5-year routine maintenance provision",
+             "any": ["routine maintenance", "five year maintenance", "5 year maintenance", "maintenance contract"]},
+            {"id": "pmgsy.omms", "kind": "keyword", "label": "OMMAS entry",
+             "any": ["omms", "ommas", "online management monitoring"]}
+        ]
+    },
+    "AMRUT": {
+        "name": "Atal Mission for Rejuvenation and Urban Transformation",
+        "detect": ["amrut", "atal mission", "urban transformation", "service level improvement plan"],
+        "rules": [
+            {"id": "amrut.slip", "kind": "section", "label": "Service Level Improvement Plan (SLIP)",
+             "any": ["service level improvement plan", "slip", "service level benchmark"]},
+            {"id": "amrut.gap", "kind": "section", "label": "Gap analysis of service levels",
+             "any": ["gap analysis", "existing service level", "demand supply gap"]},
+            {"id": "amrut.om", "kind": "section", "label": "O&M plan and cost recovery",
+             "any": ["operation and maintenance", "o&m cost", "user charges", "cost recovery"]},
+            {"id": "amrut.swap", "kind": "approval", "label": "State Annual Action Plan approval",
+             "any": ["state annual action plan", "saap", "state high powered steering committee", "shpsc"]},
+            {"id": "amrut.reforms", "kind": "keyword", "label": "Urban reforms linkage",
+             "any": ["reform", "e-governance", "property tax"]},
+            {"id": "amrut.env", "kind": "approval", "label": "Environmental / pollution control consent",
+             "any": ["consent to establish", "pollution control board", "environmental clearance"]}
+        ]
+    },
+    "Smart Cities": {
+        "name": "Smart Cities Mission",
+        "detect": ["smart city", "smart cities", "spv", "area based development", "pan city"],
+        "rules": [
+            {"id": "scm.abd", "kind": "section", "label": "Area-based / pan-city component",
+             "any": ["area based development", "pan city", "retrofitting", "redevelopment", "greenfield"]},
+            {"id": "scm.spv", "kind": "approval", "label": "SPV board approval",
+             "any": ["spv board", "special purpose vehicle", "board of directors approval"]},
+            {"id": "scm.citizen", "kind": "section", "label": "Citizen consultation",
+             "any": ["citizen consultation", "citizen engagement", "stakeholder consultation"]},
+            {"id": "scm.ict", "kind": "keyword", "label": "ICT / smart solution",
+             "any": ["iccc", "integrated command and control", "scada", "iot", "smart solution"]},
+            {"id": "scm.finance", "kind": "section", "label": "Financing plan / convergence",
+             "any": ["financing plan", "convergence", "ppp", "public private partnership"]}
+        ]
+    },
+    "MoRTH": {
+        "name": "Ministry of Road Transport and Highways standards",
+        "detect": ["morth", "national highway", "state highway", "irc", "carriageway"],
+        "rules": [
+            {"id": "morth.spec", "kind": "keyword", "label": "MoRTH specifications referenced",
+             "any": ["morth specification", "specifications for road and bridge works", "morth"]},
+            {"id": "morth.irc", "kind": "keyword", "label": "IRC codes referenced",
+             "any": ["irc:37", "irc:58", "irc:73", "irc:sp", "indian roads congress"]},
+            {"id": "morth.traffic", "kind": "section", "label": "Traffic study and projection",
+             "any": ["traffic study", "traffic projection", "pcu", "msa", "million standard axles"]},
+            {"id": "morth.alignment", "kind": "section", "label": "Alignment / geometric design",
+             "any": ["alignment", "geometric design", "horizontal curve", "vertical profile"]},
+            {"id": "morth.safety", "kind": "section", "label": "Road safety audit",
+             "any": ["road safety audit", "road safety", "crash barrier"]},
+            {"id": "morth.la", "kind": "approval", "label": "Land acquisition status",
+             "any": ["land acquisition", "3a notification", "3d notification", "right of way"]},
+            {"id": "morth.utility", "kind": "approval", "label": "Utility shifting",
+             "any": ["utility shifting", "utility relocation"]},
+            {"id": "morth.ec", "kind": "approval", "label": "Environmental clearance",
+             "any": ["environmental clearance", "eia", "environmental impact assessment"]}
+        ]
+    },
+    "JJM": {
+        "name": "Jal Jeevan Mission",
+        "detect": ["jal jeevan", "jjm", "functional household tap connection", "fhtc", "har ghar jal"],
+        "rules": [
+            {"id": "jjm.fhtc", "kind": "keyword", "label": "FHTC at 55 lpcd",
+             "any": ["fhtc", "functional household tap connection", "55 lpcd", "lpcd"]},
+            {"id": "jjm.source", "kind": "section", "label": "Source sustainability",
+             "any": ["source sustainability", "source strengthening", "groundwater recharge", "yield test"]},
+            {"id": "jjm.quality", "kind": "section", "label": "Water quality testing",
+             "any": ["water quality", "water testing laboratory", "field test kit"]},
+            {"id": "jjm.vap", "kind": "approval", "label": "Village Action Plan / Gram Sabha resolution",
+             "any": ["village action plan", "gram sabha", "gram panchayat resolution", "vwsc", "pani samiti"]},
+            {"id": "jjm.contribution", "kind": "keyword", "label": "Community contribution",
+             "any": ["community contribution", "capital cost contribution"]},
+            {"id": "jjm.om", "kind": "section", "label": "O&M arrangement",
+             "any": ["operation and maintenance", "user charges", "o&m"]},
+            {"id": "jjm.grey", "kind": "keyword", "label": "Greywater management",
+             "any": ["greywater", "grey water", "soak pit"]}
+        ]
+    },
+    "NEC": {
+        "name": "North Eastern Council",
+        "detect": ["north eastern council", "nec", "north east", "mdoner", "northeast"],
+        "rules": [
+            {"id": "nec.format", "kind": "section", "label": "Project justification and objectives",
+             "any": ["justification", "need of the project", "objectives"]},
+            {"id": "nec.state", "kind": "approval", "label": "State government recommendation / priority",
+             "any": ["state government recommendation", "state priority", "recommended by the state", "planning department"]},
+            {"id": "nec.non_duplication", "kind": "approval", "label": "Non-duplication certificate",
+             "any": ["non duplication", "not been funded", "no duplication"]},
+            {"id": "nec.land", "kind": "approval", "label": "Encumbrance-free land certificate",
+             "any": ["encumbrance free", "land availability certificate", "land is available"]},
+            {"id": "nec.om", "kind": "keyword", "label": "Post-completion O&M commitment",
+             "any": ["operation and maintenance", "maintenance after completion", "o&m"]},
+            {"id": "nec.outcome", "kind": "section", "label": "Outcome indicators",
+             "any": ["outcome", "output indicators", "monitoring framework"]}
+        ]
+    }
+}
@@ -0,0 +1,69 @@
+# src/concurrency.py
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List
+
+# Bounded fan-out for blocking LLM / network calls
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 1.0
+
+
+def call_with_retry(
+    fn: Callable[..., Any],
+    *args,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    max_backoff: float = 16.0,
+    **kwargs
+) -> Any:
+    """
+    Call fn(*args, **kwargs), retrying on any exception with exponential
+    backoff plus jitter. Re-raises the last error once retries are used up.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = min(max_backoff, backoff * (2 ** attempt))
+            delay *= 0.5 + random.random() / 2
+            name = getattr(fn, "__name__", "call")
+            print(f"[WARN] {name} failed ({e}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def ordered_map(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    default: Any = None
+) -> List[Any]:
+    """
+    Run fn(item) for every item on a bounded thread pool.
+
+    - at most `max_workers` calls are in flight at once
+    - each call is retried with backoff (see call_with_retry)
+    - results come back in input order; an item that still fails after
+      all retries yields `default` instead of aborting the whole batch
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def run(item):
+        try:
+            return call_with_retry(fn, item, retries=retries, backoff=backoff)
+        except Exception as e:
+            print(f"[ERROR] giving up after {retries} retries: {e}")
+            return default
+
+    workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, items))
@@ -1,8 +1,8 @@
-from langchain_community.document_loaders import PyPDFLoader
+from src.pdf_document import extract_document
 
-def load_dpr_pdf(path):
+def load_dpr_pdf(path, sha256=None):
     try:
-        loader = PyPDFLoader(path)
-        return loader.load()
+        # shared single-pass PyMuPDF extraction (cached by digest / path + mtime + size)
+        return extract_document(path, sha256=sha256).to_documents()
     except Exception:
         return []
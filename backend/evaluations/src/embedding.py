@@ -1,15 +1,40 @@
+import re
+import hashlib
 from typing import List, Any
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from src.data_loader import load_all_documents
+from src.embedding_models import get_embedding_model, encode_texts, DEFAULT_EMBEDDING_MODEL, EMBED_BATCH_SIZE
+
+# Near-duplicate threshold: max differing bits between 64-bit simhashes
+NEAR_DUP_BITS = 3
+_WORD_RE = re.compile(r"\w+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit simhash over word shingles (near-duplicate fingerprint)."""
+    words = _WORD_RE.findall(text.lower())
+    grams = [" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))]
+    weights = [0] * 64
+    for g in grams:
+        h = int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
 
 class EmbeddingPipeline:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.model = SentenceTransformer(model_name)
-        print(f"[INFO] Loaded embedding model: {model_name}")
+        self.model_name = model_name
+
+    @property
+    def model(self):
+        return get_embedding_model(self.model_name)
 
     def chunk_documents(self, documents: List[Any]) -> List[Any]:
         splitter = RecursiveCharacterTextSplitter(
@@ -22,10 +47,51 @@ class EmbeddingPipeline:
         print(f"[INFO] Split {len(documents)} documents into {len(chunks)} chunks.")
         return chunks
 
-    def embed_chunks(self, chunks: List[Any]) -> np.ndarray:
+    def dedupe_chunks(self, chunks: List[Any], max_bits: int = NEAR_DUP_BITS) -> List[Any]:
+        """
+        Drop empty, exact-duplicate and near-duplicate chunks (repeated
+        headers, footers, boilerplate), keeping the first occurrence.
+
+        Near duplicates are simhashes within `max_bits` Hamming distance.
+        Fingerprints are bucketed by four 16-bit bands; any pair within
+        3 bits shares at least one band, so only bucket mates are compared.
+        """
+        seen_exact = set()
+        bands = [{} for _ in range(4)]
+        kept = []
+
+        for chunk in chunks:
+            norm = _normalize(chunk.page_content)
+            if not norm:
+                continue
+            digest = hashlib.sha1(norm.encode("utf-8")).digest()
+            if digest in seen_exact:
+                continue
+            seen_exact.add(digest)
+
+            fp = simhash(norm)
+            keys = [(fp >> (16 * b)) & 0xFFFF for b in range(4)]
+            if any(
+                bin(fp ^ other).count("1") <= max_bits
+                for b, key in enumerate(keys)
+                for other in bands[b].get(key, ())
+            ):
+                continue
+            for b, key in enumerate(keys):
+                bands[b].setdefault(key, []).append(fp)
+            kept.append(chunk)
+
+        print(f"[INFO] Dropped {len(chunks) - len(kept)} duplicate chunks, kept {len(kept)}.")
+        return kept
+
+    def prepare(self, documents: List[Any]) -> List[Any]:
+        """Chunk + dedupe: the ingest path used by the API."""
+        return self.dedupe_chunks(self.chunk_documents(documents))
+
+    def embed_chunks(self, chunks: List[Any], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
         texts = [chunk.page_content for chunk in chunks]
         print(f"[INFO] Generating embeddings for {len(texts)} chunks...")
-        embeddings = self.model.encode(texts, show_progress_bar=True)
+        embeddings = encode_texts(texts, self.model_name, batch_size=batch_size)
         print(f"[INFO] Embeddings shape: {embeddings.shape}")
         return embeddings
 
@@ -0,0 +1,191 @@
+# src/embedding_cache.py
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List
+
+from src.cache import CACHE_DIR
+
+# Max vectors kept per model (384-dim MiniLM: ~1.5 KB each)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "100000"))
+
+
+# per-slot tag: prefix of sha256(cache key), identifies which key a slot holds
+TAG_BYTES = 16
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _tag(key: str) -> bytes:
+    return hashlib.sha256(key.encode("utf-8")).digest()[:TAG_BYTES]
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache for one model, keyed by sha256 of chunk text.
+
+    Vectors live in a fixed-capacity float32 memmap (`vectors.f32`,
+    capacity x dim); a SQLite table maps hash -> slot and tracks last
+    access. When full, the least recently used slots are reused.
+    Safe across threads and worker processes: slot allocation happens
+    inside an IMMEDIATE transaction, and vectors are written only after
+    it commits. Each slot carries a tag of the hash it holds
+    (`tags.u8`); a read is a hit only if the tag matches before and
+    after copying the vector, so a slot being reused is never returned
+    under the wrong hash. Reads do not write: access times are buffered
+    and flushed with the next put (or every ACCESS_FLUSH hits).
+    """
+
+    ACCESS_FLUSH = 256
+
+    def __init__(self, model_name: str, dim: int, capacity: int = EMBED_CACHE_SIZE, root: str | None = None):
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.dir = os.path.join(root or os.path.join(CACHE_DIR, "embeddings"), f"{safe_name}-{dim}")
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.vectors = self._open_memmap("vectors.f32", "float32", (capacity, dim))
+        self.tags = self._open_memmap("tags.u8", "uint8", (capacity, TAG_BYTES))
+
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}   # hash -> last access time, not yet written
+        self._conn = sqlite3.connect(os.path.join(self.dir, "index.sqlite"), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS slots ("
+            "hash TEXT PRIMARY KEY, slot INTEGER NOT NULL UNIQUE, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS slots_accessed ON slots(accessed)")
+        # EMBED_CACHE_SIZE may have been lowered since the cache was created
+        dropped = self._conn.execute("DELETE FROM slots WHERE slot >= ?", (capacity,)).rowcount
+        if dropped:
+            print(f"[INFO] Embedding cache {model_name}: dropped {dropped} slots beyond capacity {capacity}")
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _open_memmap(self, name: str, dtype: str, shape: tuple) -> np.memmap:
+        """Map `name` as `shape`; an existing file is grown if too small (never shrunk: others may map it)."""
+        path = os.path.join(self.dir, name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _read(self, h: str, slot: int):
+        """Vector in `slot` if it is tagged with `h` (checked before and after the copy), else None."""
+        tag = _tag(h)
+        if bytes(self.tags[slot]) != tag:
+            return None
+        vec = np.array(self.vectors[slot])
+        return vec if bytes(self.tags[slot]) == tag else None
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT hash, slot FROM slots WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for h, slot in rows:
+                    vec = self._read(h, slot)
+                    if vec is not None:
+                        found[h] = vec
+                        self._accessed[h] = now
+            if len(self._accessed) >= self.ACCESS_FLUSH:
+                self._conn.execute("BEGIN")
+                self._flush_accessed(self._conn)
+                self._conn.execute("COMMIT")
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def _flush_accessed(self, cur):
+        # caller holds self._lock and an open transaction
+        if self._accessed:
+            cur.executemany(
+                "UPDATE slots SET accessed = ? WHERE hash = ?",
+                [(t, h) for h, t in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        # validate everything before any slot is touched
+        vectors = {}
+        for h, vec in items.items():
+            vec = np.asarray(vec, dtype=np.float32)
+            if vec.shape != (self.dim,):
+                raise ValueError(f"Embedding for {h} has shape {vec.shape}, expected ({self.dim},)")
+            vectors[h] = vec
+
+        now = time.time()
+        with self._lock:
+            cur = self._conn.cursor()
+            assigned = []
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                # buffered hits first, so eviction sees current access order
+                self._flush_accessed(cur)
+                (next_slot,) = cur.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM slots").fetchone()
+                for h in vectors:
+                    row = cur.execute("SELECT slot FROM slots WHERE hash = ?", (h,)).fetchone()
+                    if row:
+                        slot = row[0]
+                    elif next_slot < self.capacity:
+                        slot = next_slot
+                        next_slot += 1
+                    else:
+                        # reuse the least recently accessed slot
+                        old_hash, slot = cur.execute(
+                            "SELECT hash, slot FROM slots ORDER BY accessed ASC LIMIT 1"
+                        ).fetchone()
+                        cur.execute("DELETE FROM slots WHERE hash = ?", (old_hash,))
+                        self.evictions += 1
+                    assigned.append((h, slot))
+                    self._accessed.pop(h, None)
+                    cur.execute(
+                        "INSERT OR REPLACE INTO slots (hash, slot, accessed) VALUES (?, ?, ?)",
+                        (h, slot, now)
+                    )
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+            # mapping is committed: now fill the slots (untag, write, tag)
+            for h, slot in assigned:
+                self.tags[slot] = 0
+                self.vectors[slot] = vectors[h]
+                self.tags[slot] = np.frombuffer(_tag(h), dtype=np.uint8)
+            self.vectors.flush()
+            self.tags.flush()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM slots").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "size": size,
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,106 @@
+# src/embedding_models.py
+import os
+import threading
+import numpy as np
+from typing import Dict, List
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+_models: Dict[str, object] = {}
+_caches: Dict[str, object] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL):
+    """
+    Process-wide SentenceTransformer registry.
+
+    Each model is loaded once, lazily on first use, and shared by every
+    FaissVectorStore / EmbeddingPipeline in the process. Loading is guarded
+    by a per-model lock so concurrent first callers do not load it twice.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        lock = _locks.setdefault(model_name, threading.Lock())
+
+    with lock:
+        model = _models.get(model_name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+            _models[model_name] = model
+            print(f"[INFO] Loaded embedding model: {model_name}")
+    return model
+
+
+def get_embedding_cache(model_name: str = DEFAULT_EMBEDDING_MODEL):
+    """Shared on-disk EmbeddingCache for a model (created on first use)."""
+    from src.embedding_cache import EmbeddingCache
+
+    cache = _caches.get(model_name)
+    if cache is None:
+        dim = get_embedding_model(model_name).get_sentence_embedding_dimension()
+        with _registry_lock:
+            cache = _caches.get(model_name)
+            if cache is None:
+                cache = EmbeddingCache(model_name, dim)
+                _caches[model_name] = cache
+    return cache
+
+
+def embedding_cache_stats() -> List[Dict]:
+    return [cache.stats() for cache in list(_caches.values())]
+
+
+def encode_texts(texts: List[str], model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = EMBED_BATCH_SIZE, use_cache: bool = True) -> np.ndarray:
+    """
+    Encode texts in fixed-size batches, longest first.
+
+    Sorting by length keeps padding inside each batch minimal; the output
+    rows are returned in the caller's original order as float32. With
+    use_cache, vectors are looked up by text hash in the on-disk
+    EmbeddingCache and only unseen texts reach the model.
+    """
+    from src.embedding_cache import text_hash
+
+    model = get_embedding_model(model_name)
+    dim = model.get_sentence_embedding_dimension()
+    out = np.empty((len(texts), dim), dtype="float32")
+    if not texts:
+        return out
+
+    hashes = [text_hash(t) for t in texts]
+    cache = get_embedding_cache(model_name) if use_cache else None
+    known = cache.get_many(hashes) if cache else {}
+
+    # encode each unseen text once, even if it repeats within the batch
+    todo = {}
+    for i, h in enumerate(hashes):
+        if h not in known and h not in todo:
+            todo[h] = i
+    pending = list(todo.values())
+
+    pending.sort(key=lambda i: -len(texts[i]))
+    fresh = {}
+    for start in range(0, len(pending), batch_size):
+        idx = pending[start:start + batch_size]
+        vecs = np.asarray(
+            model.encode([texts[i] for i in idx], batch_size=batch_size, show_progress_bar=False),
+            dtype="float32"
+        )
+        for i, v in zip(idx, vecs):
+            fresh[hashes[i]] = v
+
+    if cache:
+        cache.put_many(fresh)
+        print(f"[INFO] Embedding cache: {len(texts) - len(pending)} reused, {len(pending)} encoded")
+
+    known.update(fresh)
+    for i, h in enumerate(hashes):
+        out[i] = known[h]
+    return out
@@ -1,36 +1,88 @@
 import os
+import re
 import json
-import fitz
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 
+from src.llm import get_llm
 from src.web_search import duckduckgo_search
 from src.agents import MultiAgentSystem
 from src.compliance import ComplianceChecker
 from src.benchmarks import CostBenchmarkEngine
 from src.boq_parser import extract_boq_sections, parse_boq_from_text, boq_summary
+from src.boq_tables import find_boq_pages, extract_boq_tables
 from src.gis_analysis import analyze_site
 from src.risk_simulator import run_monte_carlo
+from src.concurrency import ordered_map
+from src.pipeline import StageGraph
+from src.pdf_document import extract_document
+from src.incremental import EvaluationState, text_sha
+from src.section_index import SectionIndex, build_section_index
 
 # ✅ Correct import name
 from src.pdf_annotator import annotate_pdf  
 
 load_dotenv()
 
+# Page-level fan-out: concurrency limit, per-call timeout (seconds), retries
+PAGE_WORKERS = int(os.getenv("PAGE_WORKERS", "8"))
+PAGE_TIMEOUT = float(os.getenv("PAGE_TIMEOUT", "60"))
+PAGE_RETRIES = int(os.getenv("PAGE_RETRIES", "2"))
+
+# Stage graph: how many pipeline stages may run at once
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "8"))
+
+# Module context: chunks retrieved per module, packed up to a token budget
+MODULE_TOP_K = int(os.getenv("MODULE_TOP_K", "8"))
+MODULE_CONTEXT_TOKENS = int(os.getenv("MODULE_CONTEXT_TOKENS", "1200"))
+CHARS_PER_TOKEN = 4   # rough estimate for English text
+MIN_PACKED_CHARS = 200   # a trimmed tail shorter than this is dropped
+
+_TERM_RE = re.compile(r"[a-z0-9]{3,}")
+
+# DPR section title keywords each module is routed to (see SectionIndex)
+MODULE_SECTIONS = {
+    "Objectives": ["objective", "introduction", "background", "justification", "need for"],
+    "Technical Quality": ["technical", "design", "engineering", "specification"],
+    "Financials": ["cost", "financ", "estimate", "budget", "bill of quantities", "boq"],
+    "Timeline": ["schedule", "timeline", "implementation", "phasing", "duration"],
+    "Risks": ["risk", "mitigation"],
+    "Policy Fit": ["scheme", "policy", "compliance", "convergence"],
+    "Sustainability": ["environment", "social", "sustainab", "impact"]
+}
+
+# Monte Carlo: run until P10/P50/P90 are known to +/- MC_REL_TOL (95% CI), at most MC_MAX_SIMS draws
+# (MC_REL_TOL=0 switches to a fixed run_monte_carlo default n_sims)
+MC_REL_TOL = float(os.getenv("MC_REL_TOL", "0.01"))
+MC_MAX_SIMS = int(os.getenv("MC_MAX_SIMS", "200000"))
+
+# sections searched first for metadata such as the project location
+LOCATION_SECTIONS = ["location", "site", "project detail", "project profile", "salient", "introduction", "general"]
+
+
+def _clip(text: str, chars: int) -> str:
+    return text if len(text) <= chars else text[:chars] + "\n...[TRIMMED]..."
+
 
 class DPRAssistant:
 
-    def __init__(self, model="llama-3.1-8b-instant"):
-        self.llm = ChatGroq(
-            model=model,
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            max_tokens=1800
-        )
+    def __init__(
+        self,
+        model="llama-3.1-8b-instant",
+        page_workers: int = PAGE_WORKERS,
+        page_timeout: float = PAGE_TIMEOUT,
+        page_retries: int = PAGE_RETRIES
+    ):
+        self.llm = get_llm(model, max_tokens=1800)
+
+        # Page client: hard per-call timeout, retries are handled by ordered_map
+        self.page_llm = get_llm(model, max_tokens=1800, timeout=page_timeout, max_retries=0)
+        self.page_workers = page_workers
+        self.page_retries = page_retries
 
         self.agents = MultiAgentSystem(strong_mode=True)
         self.compliance_checker = ComplianceChecker()
         self.benchmarks = CostBenchmarkEngine()
-        self.input_pdf_path = None  # will be set from FastAPI
+        self.input_pdf_path = None  # default PDF when evaluate() gets no pdf_path
 
     # ----------------------------------------------------------------
     # TEXT CHUNKER
@@ -41,7 +93,7 @@ class DPRAssistant:
     # ----------------------------------------------------------------
     # PAGE-LEVEL ISSUE DETECTION
     # ----------------------------------------------------------------
-    def detect_page_issues(self, page_text: str, page_num: int):
+    def _page_issues_once(self, page_text: str, page_num: int):
         prompt = f"""
 You are a Government DPR auditor performing page-level analysis.
 
@@ -58,77 +110,141 @@ PAGE TEXT:
 
 Return JSON ONLY.
 """
+        # transport errors / timeouts propagate so the caller can retry
+        resp = self.page_llm.invoke([prompt]).content.strip()
         try:
-            resp = self.llm.invoke([prompt]).content.strip()
             return json.loads(resp)
-        except:
+        except ValueError:
             return []
 
+    def detect_all_page_issues(self, page_texts, pages=None, keep_failures: bool = False):
+        """
+        Run page-level detection over all pages (or only the page numbers
+        in `pages`) on a bounded worker pool. Returns one issue list per
+        requested page, in order. Pages that keep failing yield [] (each
+        its own), or None with `keep_failures` so the caller can retry them.
+        """
+        if pages is None:
+            pages = range(len(page_texts))
+
+        def page_task(args):
+            issues = self._page_issues_once(*args)
+            return [] if issues is None else issues   # None is reserved for failures
+
+        results = ordered_map(
+            page_task,
+            [(page_texts[p], p) for p in pages],
+            max_workers=self.page_workers,
+            retries=self.page_retries,
+            default=None
+        )
+        return results if keep_failures else [[] if r is None else r for r in results]
+
     # ----------------------------------------------------------------
-    # MAIN EVALUATION PIPELINE
+    # PIPELINE STAGES
     # ----------------------------------------------------------------
-    def evaluate(self, dpr_text: str):
-
-        print("[INFO] Running page-by-page issue detection...")
+    def _page_issues(self, document, state: EvaluationState):
+        # only pages whose text changed since the previous evaluation are re-run
+        hashes = [text_sha(text) for text in document.pages]
+        all_page_issues = [state.page_issues(sha) for sha in hashes]
+        state.changed_pages = [p for p, issues in enumerate(all_page_issues) if issues is None]
+
+        print(f"[INFO] Running issue detection on {len(state.changed_pages)}/{document.page_count} pages...")
+        detected = self.detect_all_page_issues(document.pages, pages=state.changed_pages, keep_failures=True)
+        for p, page_issues in zip(state.changed_pages, detected):
+            all_page_issues[p] = page_issues
+
+        # failed pages are not remembered, so the next run retries them
+        state.pages = [
+            {"sha": sha, "issues": page_issues}
+            for sha, page_issues in zip(hashes, all_page_issues)
+            if page_issues is not None
+        ]
 
-        # --------------------------
-        # Detect issues per page
-        # --------------------------
-        pdf = fitz.open(self.input_pdf_path)
         issues_for_pdf = []
-
-        for p, page in enumerate(pdf):
-            page_text = page.get_text()
-            page_issues = self.detect_page_issues(page_text, p)
-
-            for issue in page_issues:
+        for p, page_issues in enumerate(all_page_issues):
+            for issue in page_issues or []:
                 issues_for_pdf.append({
                     "page": p,
                     "snippet": issue.get("snippet", ""),
                     "meta": issue  # contains issue + severity
                 })
+        return issues_for_pdf
+
+    def _pack(self, texts, budget_tokens=MODULE_CONTEXT_TOKENS):
+        """Concatenate texts in order until the token budget is used up (the last one trimmed to fit)."""
+        budget = budget_tokens * CHARS_PER_TOKEN
+        packed, used = [], 0
+        for text in texts:
+            room = budget - used
+            if len(text) > room:
+                if room >= MIN_PACKED_CHARS or not packed:
+                    packed.append(text[:room])
+                break
+            packed.append(text)
+            used += len(text)
+        return "\n---\n".join(packed)
+
+    def _module_contexts(self, modules, chunks, global_context, store=None, sections=None, document_text=""):
+        """
+        Context per module title. With the DPR's FAISS store, all module
+        questions are encoded in one batch and searched in one call; the
+        top hits are packed up to MODULE_CONTEXT_TOKENS. Without a store,
+        fall back to the chunk sharing the most terms with the question,
+        scored against term sets computed once per chunk.
+
+        With a SectionIndex, the module's own DPR section (MODULE_SECTIONS)
+        leads the context and takes up to half of the budget.
+        """
+        if store is not None and store.index is not None and store.index.ntotal:
+            queries = [f"{title}: {question}" for title, question in modules.items()]
+            hits = store.query_batch(queries, top_k=MODULE_TOP_K)
+            candidates = {}
+            for title, module_hits in zip(modules, hits):
+                texts, seen = [], set()
+                for h in module_hits:
+                    meta = h["metadata"]
+                    if meta["text"] in seen:
+                        continue
+                    seen.add(meta["text"])
+                    page = meta.get("page")
+                    texts.append(meta["text"] if page is None else f"[p.{page + 1}] {meta['text']}")
+                candidates[title] = texts or [global_context]
+        else:
+            views = [set(_TERM_RE.findall(ch.lower())) for ch in chunks]
+            candidates = {}
+            for title, question in modules.items():
+                terms = set(_TERM_RE.findall(question.lower()))
+                best, best_score = global_context, 0
+                for ch, view in zip(chunks, views):
+                    score = len(terms & view)
+                    if score > best_score:
+                        best, best_score = ch, score
+                candidates[title] = [best]
+
+        contexts = {}
+        for title in modules:
+            texts = candidates[title]
+            if sections is not None and title in MODULE_SECTIONS:
+                span = sections.text(document_text, MODULE_SECTIONS[title]).strip()
+                if span:
+                    texts = [span[:MODULE_CONTEXT_TOKENS * CHARS_PER_TOKEN // 2]] + texts
+            contexts[title] = self._pack(texts)
+        return contexts
+
+    def _module_eval(self, title, question, selected_chunk):
+        web = duckduckgo_search(
+            f"{question} DPR India CPWD MoRTH norms",
+            max_results=5
+        )
+        web_ctx = "\n".join(web)[:1000]
 
-        pdf.close()
-
-        # --------------------------
-        # Chunk for LLM processing
-        # --------------------------
-        chunks = self._chunk(dpr_text)
-        global_context = "\n".join(chunks[:3])
-
-        modules = {
-            "Objectives": "Evaluate clarity & justification.",
-            "Technical Quality": "Check engineering feasibility.",
-            "Financials": "Validate cost vs CPWD/PWD benchmarks.",
-            "Timeline": "Check feasibility vs typical Indian norms.",
-            "Risks": "Identify major risks & mitigation.",
-            "Policy Fit": "Check compliance with Govt schemes.",
-            "Sustainability": "Environmental & social assessment."
-        }
-
-        module_summaries = []
-        print("[INFO] Running structured module evaluation...")
-
-        for title, question in modules.items():
-
-            selected_chunk = global_context
-            for ch in chunks:
-                if any(w in ch.lower() for w in question.lower().split()):
-                    selected_chunk = ch
-                    break
-
-            web = duckduckgo_search(
-                f"{question} DPR India CPWD MoRTH norms",
-                max_results=5
-            )
-            web_ctx = "\n".join(web)[:1000]
-
-            mod_prompt = f"""
+        mod_prompt = f"""
 ### Module: {title}
 ### Question: {question}
 
 ### DPR Extract:
-{selected_chunk[:1400]}
+{selected_chunk}
 
 ### Web References:
 {web_ctx}
@@ -136,32 +252,73 @@ Return JSON ONLY.
 Write 200–300 words. End with Score (1–10).
 """
 
-            resp = self.llm.invoke([mod_prompt]).content.strip()
-            module_summaries.append(f"## {title}\n{resp}\n")
-
-        # --------------------------
-        # Multi-agent system
-        # --------------------------
-        print("[INFO] Multi-agent review...")
-        agent_summary = self.agents.run_full_evaluation(dpr_text)
-
-        # --------------------------
-        # BOQ / GIS / RISK
-        # --------------------------
-        boq_text = extract_boq_sections(dpr_text)
-        boq_items = parse_boq_from_text(boq_text)
-        boq_stats = boq_summary(boq_items)
-
+        resp = self.llm.invoke([mod_prompt]).content.strip()
+        return f"## {title}\n{resp}\n"
+
+    def _boq(self, boq_text, pdf_path=None, boq_pages=()):
+        # typed rows from the BOQ tables; flattened-text parsing as fallback
+        boq_items = []
+        if pdf_path and boq_pages:
+            try:
+                boq_items = extract_boq_tables(pdf_path, boq_pages)
+            except Exception as e:
+                print(f"[WARN] BOQ table extraction failed: {e}")
+
+        source = "tables" if boq_items else "text"
+        if not boq_items:
+            boq_items = parse_boq_from_text(boq_text)
+
+        summary = boq_summary(boq_items)
+        summary["source"] = source
+        # item-level deviations from the offline schedule of rates
+        summary["sor_benchmark"] = self.benchmarks.benchmark("DPR", summary["total_estimated_cost"], boq_items)
+        return summary
+
+    def _boq_issues(self, boq, document):
+        """Flagged BOQ rows (amount mismatches, rate outliers) as page issues."""
+        issues = []
+        for item in boq.get("flagged_items", []):
+            desc = item.get("desc", "")
+            page = item.get("page")
+            if page is None:
+                # text-parsed rows carry no page: first page with the description
+                page = next((p for p, text in enumerate(document.pages) if desc and desc in text), None)
+            if page is None:
+                continue
+            issues.append({
+                "page": page,
+                "snippet": desc,
+                "meta": {
+                    "issue": f"BOQ {item['flag'].replace('_', ' ')}: {item['detail']}",
+                    "type": "financial",
+                    "severity": "high" if item["flag"] == "amount_mismatch" else "medium",
+                    "source": "boq"
+                }
+            })
+        return issues
+
+    def _location(self, dpr_text, sections=None):
+        if sections is not None:
+            span = sections.text(dpr_text, LOCATION_SECTIONS)
+            loc_line = next((l for l in span.splitlines() if "location" in l.lower()), None)
+            if loc_line:
+                return loc_line.split(":", 1)[-1].strip()
         loc_line = next((l for l in dpr_text.splitlines() if "location" in l.lower()), None)
-        location = loc_line.split(":", 1)[-1].strip() if loc_line else "India"
-        gis_summary = analyze_site(location)
+        return loc_line.split(":", 1)[-1].strip() if loc_line else "India"
 
-        base_cost = boq_stats.get("total_estimated_cost", 50000000)
-        risk_summary = run_monte_carlo(base_cost, base_duration_days=365, n_sims=2000)
+    def _gis(self, location):
+        return analyze_site(location)
 
-        # --------------------------
-        # Final LLM synthesis
-        # --------------------------
+    def _monte_carlo(self, boq):
+        # largest BOQ items as correlated cost heads; nominal cost when no BOQ was found
+        base_cost = boq.get("total_estimated_cost") or 50000000
+        heads = [h["amount"] for h in boq.get("cost_heads", [])]
+        return run_monte_carlo(base_cost, base_duration_days=365, cost_heads=heads or None,
+                               rel_tol=MC_REL_TOL or None, max_sims=MC_MAX_SIMS)
+
+    def _final_report(self, module_summaries, agent_summary, boq_stats, gis_summary, risk_summary):
+        boq_core = {k: v for k, v in boq_stats.items() if k not in ("flagged_items", "cost_heads")}
+        boq_flags = "\n".join(f"- {f['desc']}: {f['detail']}" for f in boq_stats.get("flagged_items", []))
         final_prompt = f"""
 Synthesize:
 - Module evaluations
@@ -170,6 +327,24 @@ Synthesize:
 - GIS insights
 - Risk simulation
 
+### Module Evaluations:
+{_clip("".join(module_summaries), 4000)}
+
+### Multi-Agent Panel:
+{_clip(agent_summary, 3000)}
+
+### BOQ Analysis:
+{_clip(json.dumps(boq_core, default=str), 3500)}
+
+### BOQ Anomalies (amount mismatches / rate outliers):
+{_clip(boq_flags, 1500) or "None detected."}
+
+### GIS Insights:
+{json.dumps(gis_summary, default=str)[:800]}
+
+### Risk Simulation:
+{json.dumps(risk_summary, default=str)}
+
 Write a 600-token official DPR evaluation report:
 1. Executive Summary
 2. Technical Review
@@ -180,21 +355,153 @@ Write a 600-token official DPR evaluation report:
 7. Recommendation
 """
 
-        final_report = self.llm.invoke([final_prompt]).content.strip()
+        return self.llm.invoke([final_prompt]).content.strip()
+
+    # ----------------------------------------------------------------
+    # MAIN EVALUATION PIPELINE
+    # ----------------------------------------------------------------
+    def evaluate(self, dpr_text: str, pdf_path: str | None = None, progress=None, previous=None, store=None,
+                 sections: SectionIndex | None = None):
+        """
+        Run the full DPR evaluation as a stage graph: independent stages
+        (page issues, modules, agents, BOQ, GIS) run concurrently and each
+        stage only waits on the inputs it actually consumes.
+
+        `progress(stage, status)` receives per-stage updates.
+
+        `previous` is the "state" returned by an earlier evaluation of this
+        DPR (or an earlier revision of it): unchanged pages keep their
+        issues, stages whose inputs are unchanged keep their output, and
+        the result carries a "diff" of added / removed issues.
+
+        `store` is the DPR's FaissVectorStore; when given, module context
+        is retrieved from it instead of keyword-matched.
+
+        `sections` is the DPR's SectionIndex (built from the PDF if not
+        given); BOQ extraction, module context and the location lookup
+        read their sections directly instead of scanning the whole text.
+        """
+        pdf_path = pdf_path or self.input_pdf_path
+        graph = StageGraph(max_workers=STAGE_WORKERS)
+        state = EvaluationState(previous)
+
+        # one PyMuPDF pass shared by page detection, BOQ and annotation
+        document = extract_document(pdf_path)
+        if sections is None:
+            sections = build_section_index(document)
 
         # --------------------------
-        # GENERATE HIGHLIGHTED PDF
+        # Detect issues per page -> highlighted PDF
         # --------------------------
-        print("[INFO] Creating highlighted PDF...")
+        graph.add("page_issues", lambda: self._page_issues(document, state))
 
         # ❗ FIX: Correct signature
-        highlighted_pdf = annotate_pdf(
-            input_path=self.input_pdf_path,   # MATCHES YOUR FUNCTION
-            issues=issues_for_pdf
+        graph.add(
+            "highlighted_pdf",
+            lambda page_issues, boq: annotate_pdf(
+                input_path=pdf_path,   # MATCHES YOUR FUNCTION
+                issues=page_issues + self._boq_issues(boq, document),   # + flagged BOQ rows
+                document=document
+            ),
+            deps=["page_issues", "boq"]
+        )
+
+        # --------------------------
+        # Chunk for LLM processing
+        # --------------------------
+        chunks = self._chunk(dpr_text)
+        global_context = "\n".join(chunks[:3])
+
+        modules = {
+            "Objectives": "Evaluate clarity & justification.",
+            "Technical Quality": "Check engineering feasibility.",
+            "Financials": "Validate cost vs CPWD/PWD benchmarks.",
+            "Timeline": "Check feasibility vs typical Indian norms.",
+            "Risks": "Identify major risks & mitigation.",
+            "Policy Fit": "Check compliance with Govt schemes.",
+            "Sustainability": "Environmental & social assessment."
+        }
+
+        # stage name -> the text it reads; a stage reruns only if that
+        # (or one of its dependencies) changed since the previous run
+        inputs = {}
+
+        contexts = self._module_contexts(
+            modules, chunks, global_context,
+            store=store, sections=sections, document_text=document.text
         )
 
+        module_stages = []
+        for title, question in modules.items():
+            ctx = contexts[title]
+            name = graph.add(f"module:{title}", lambda t=title, q=question, c=ctx: self._module_eval(t, q, c))
+            inputs[name] = ctx
+            module_stages.append(name)
+
+        # --------------------------
+        # BOQ / GIS / RISK
+        # --------------------------
+        boq_text = extract_boq_sections(document.text, sections=sections)
+        boq_pages = find_boq_pages(document, sections)
+        location = self._location(document.text, sections=sections)
+        graph.add("boq", lambda: self._boq(boq_text, pdf_path, boq_pages))
+        graph.add("gis", lambda: self._gis(location))
+        inputs["boq"] = boq_text + "".join(document.pages[p] for p in boq_pages) + self.benchmarks.db.fingerprint
+        inputs["gis"] = location
+        graph.add("monte_carlo", self._monte_carlo, deps=["boq"])
+
+        # --------------------------
+        # Scheme compliance: one automaton pass over the DPR, evidence for the policy agent
+        # --------------------------
+        graph.add("compliance", lambda: self.compliance_checker.check(document.text, document.page_offsets))
+        graph.add("compliance_evidence", lambda compliance: self.compliance_checker.format_evidence(compliance),
+                  deps=["compliance"])
+        inputs["compliance"] = document.text
+
+        # --------------------------
+        # Multi-agent system (risk agent consumes the Monte Carlo summary)
+        # --------------------------
+        panel = self.agents.add_stages(graph, dpr_text, monte_carlo_stage="monte_carlo",
+                                       compliance_stage="compliance_evidence")
+        agent_context = self.agents.panel_context(dpr_text)
+        for name in graph.stages:
+            if name.startswith("agent:"):
+                inputs[name] = agent_context
+
+        # --------------------------
+        # Final LLM synthesis waits on everything
+        # --------------------------
+        graph.add(
+            "final_report",
+            lambda **deps: self._final_report(
+                [deps[m] for m in module_stages],
+                deps[panel],
+                deps["boq"],
+                deps["gis"],
+                deps["monte_carlo"]
+            ),
+            deps=module_stages + [panel, "boq", "gis", "monte_carlo"]
+        )
+
+        # page issues are reused per page; the annotated PDF is always redrawn
+        for name, stage in graph.stages.items():
+            if name not in ("page_issues", "highlighted_pdf"):
+                stage.fn = state.memoize(name, stage.fn, inputs.get(name, ""))
+
+        print("[INFO] Running evaluation stage graph...")
+        results, timings = graph.run(listener=progress)
+
+        if state.has_previous:
+            print(f"[INFO] Re-evaluation reused {len(state.reused)} stages, "
+                  f"{len(state.changed_pages)} pages changed")
+
+        issues = results["page_issues"] + self._boq_issues(results["boq"], document)
         return {
-            "report": final_report,
-            "highlighted_pdf": highlighted_pdf,
-            "issues": issues_for_pdf
+            "report": results["final_report"],
+            "highlighted_pdf": results["highlighted_pdf"],
+            "issues": issues,
+            "timings": timings,
+            "compliance": results["compliance"],
+            "diff": state.diff(issues),
+            "state": state.to_dict(issues)
         }
@@ -0,0 +1,89 @@
+# src/incremental.py
+import json
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+def text_sha(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def stage_key(name: str, inputs: str, deps: Dict[str, Any]) -> str:
+    """Hash of everything a stage consumes: its own input text plus its dep values."""
+    payload = json.dumps([name, text_sha(inputs), deps], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _issue_key(issue: Dict[str, Any]) -> tuple:
+    meta = issue.get("meta") or {}
+    return (issue.get("page"), issue.get("snippet", ""), meta.get("issue", ""))
+
+
+def diff_issues(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Issues present only in `new` (added) / only in `old` (removed)."""
+    old_keys = {_issue_key(i) for i in old}
+    new_keys = {_issue_key(i) for i in new}
+    return {
+        "added": [i for i in new if _issue_key(i) not in old_keys],
+        "removed": [i for i in old if _issue_key(i) not in new_keys],
+        "unchanged": len(old_keys & new_keys)
+    }
+
+
+class EvaluationState:
+    """
+    What the previous evaluation of a DPR left behind, so a re-run only
+    redoes work whose inputs changed.
+
+        pages  - [{"sha": page text hash, "issues": [...]}] in page order
+        stages - stage name -> {"key": stage_key(...), "value": output}
+        issues - the flat issue list that was returned
+
+    Page issues are looked up by content hash (so moved pages are reused
+    too); stage outputs are reused when their key matches exactly.
+    """
+
+    def __init__(self, previous: Optional[Dict[str, Any]] = None):
+        previous = previous or {}
+        self.has_previous = bool(previous)
+        self.previous_issues = previous.get("issues", [])
+        self._page_issues = {p["sha"]: p["issues"] for p in previous.get("pages", [])}
+        self._stages = previous.get("stages", {})
+
+        self.pages: List[Dict[str, Any]] = []
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.changed_pages: List[int] = []
+        self.reused: List[str] = []
+        self._lock = threading.Lock()
+
+    def page_issues(self, sha: str) -> Optional[List[Dict[str, Any]]]:
+        return self._page_issues.get(sha)
+
+    def memoize(self, name: str, fn: Callable[..., Any], inputs: str = "") -> Callable[..., Any]:
+        """Wrap a stage function so an unchanged input reuses the stored output."""
+        def run(**deps):
+            key = stage_key(name, inputs, deps)
+            prev = self._stages.get(name)
+            if prev is not None and prev.get("key") == key:
+                value = prev["value"]
+                with self._lock:
+                    self.reused.append(name)
+            else:
+                value = fn(**deps)
+            with self._lock:
+                self.stages[name] = {"key": key, "value": value}
+            return value
+        return run
+
+    def diff(self, issues: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not self.has_previous:
+            return None
+        return {
+            **diff_issues(self.previous_issues, issues),
+            "changed_pages": self.changed_pages,
+            "reused_stages": sorted(self.reused)
+        }
+
+    def to_dict(self, issues: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"pages": self.pages, "stages": self.stages, "issues": issues}
@@ -0,0 +1,83 @@
+# src/index_benchmark.py
+"""
+Recall-vs-latency benchmark for the ANN index types in src/index_factory.
+
+Runs every index type (and a sweep of nprobe / efSearch) against the exact
+flat baseline on synthetic clustered vectors shaped like MiniLM embeddings.
+
+    python -m src.index_benchmark --n 200000 --dim 384 --queries 500
+"""
+import time
+import argparse
+import numpy as np
+import faiss
+
+from src.index_factory import build_index, tune_index, choose_index_type
+
+
+def synthetic_vectors(n: int, dim: int, n_clusters: int = 256, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, size=n)
+    data = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(data)
+    return data
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / (truth.shape[0] * k)
+
+
+def timed_search(index, queries: np.ndarray, k: int):
+    t = time.perf_counter()
+    _, I = index.search(queries, k)
+    return I, (time.perf_counter() - t) * 1000 / len(queries)
+
+
+def run(n: int, dim: int, n_queries: int, k: int, memory_mb: float):
+    data = synthetic_vectors(n + n_queries, dim)
+    base, queries = data[:n], data[n:]
+
+    print(f"[INFO] n={n} dim={dim} queries={n_queries} k={k}")
+    print(f"[INFO] auto choice at {memory_mb:.0f} MB budget: {choose_index_type(n, dim, memory_mb)}")
+
+    flat, _ = build_index(base, index_type="flat")
+    truth, flat_ms = timed_search(flat, queries, k)
+
+    rows = [("flat", "-", 0.0, 1.0, flat_ms)]
+
+    sweeps = {
+        "hnsw": ("efSearch", [16, 32, 64, 128, 256]),
+        "ivf_flat": ("nprobe", [1, 4, 16, 64]),
+        "ivf_pq": ("nprobe", [1, 4, 16, 64])
+    }
+    for index_type, (knob, values) in sweeps.items():
+        if index_type == "ivf_pq" and n < 256 * 39:
+            continue
+        t = time.perf_counter()
+        index, info = build_index(base, index_type=index_type)
+        build_s = time.perf_counter() - t
+        for v in values:
+            if knob == "nprobe":
+                tune_index(index, nprobe=v)
+            else:
+                tune_index(index, ef_search=v)
+            found, ms = timed_search(index, queries, k)
+            rows.append((info["factory"], f"{knob}={v}", build_s, recall_at_k(found, truth), ms))
+
+    print(f"\n{'index':<22}{'param':<14}{'build_s':>9}{'recall@' + str(k):>11}{'ms/query':>11}{'speedup':>9}")
+    for name, param, build_s, recall, ms in rows:
+        print(f"{name:<22}{param:<14}{build_s:>9.2f}{recall:>11.3f}{ms:>11.3f}{flat_ms / ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--memory-mb", type=float, default=1024)
+    args = parser.parse_args()
+    run(args.n, args.dim, args.queries, args.k, args.memory_mb)
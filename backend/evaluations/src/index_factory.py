@@ -0,0 +1,114 @@
+# src/index_factory.py
+import os
+import math
+import faiss
+import numpy as np
+from typing import Any, Dict
+
+# "auto" picks from vector count + memory budget; otherwise one of
+# "flat", "hnsw", "ivf_flat", "ivf_pq"
+INDEX_TYPE = os.getenv("INDEX_TYPE", "auto")
+INDEX_MEMORY_MB = float(os.getenv("INDEX_MEMORY_MB", "1024"))
+INDEX_NPROBE = int(os.getenv("INDEX_NPROBE", "16"))
+INDEX_EF_SEARCH = int(os.getenv("INDEX_EF_SEARCH", "64"))
+
+FLAT_MAX_VECTORS = 20000        # below this brute force is already fast
+HNSW_MAX_VECTORS = 500000       # HNSW graph build gets slow beyond this
+HNSW_M = 32
+
+# faiss needs ~39 training points per centroid (256 per PQ codebook)
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def _nlist_for(n: int) -> int:
+    nlist = int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // _MIN_POINTS_PER_CENTROID))
+
+
+def _pq_m_for(dim: int) -> int:
+    # ~8 dims per sub-quantizer, must divide dim
+    for m in (dim // 8, dim // 6, dim // 4, dim // 12, dim // 16):
+        if m > 0 and dim % m == 0 and m <= 96:
+            return m
+    return 1
+
+
+def choose_index_type(n: int, dim: int, memory_budget_mb: float = INDEX_MEMORY_MB) -> str:
+    """
+    Pick an index type from the number of vectors and a memory budget.
+
+    - small corpora: exact flat search
+    - raw vectors fit in budget: HNSW (mid-size) or IVF-Flat (large)
+    - raw vectors do not fit: IVF-PQ (compressed codes)
+    """
+    budget = memory_budget_mb * 1024 * 1024
+    raw_bytes = n * dim * 4
+
+    if n <= FLAT_MAX_VECTORS:
+        return "flat"
+    if n <= HNSW_MAX_VECTORS and raw_bytes + n * HNSW_M * 2 * 4 <= budget:
+        return "hnsw"
+    if raw_bytes <= budget:
+        return "ivf_flat"
+    if n >= 256 * _MIN_POINTS_PER_CENTROID:
+        return "ivf_pq"
+    return "ivf_flat"
+
+
+def factory_string(index_type: str, n: int, dim: int) -> str:
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+    if index_type == "ivf_flat":
+        return f"IVF{_nlist_for(n)},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{_nlist_for(n)},PQ{_pq_m_for(dim)}"
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def tune_index(index, nprobe: int = INDEX_NPROBE, ef_search: int = INDEX_EF_SEARCH):
+    """Apply query-time knobs (nprobe for IVF, efSearch for HNSW)."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def build_index(
+    embeddings: np.ndarray,
+    index_type: str = INDEX_TYPE,
+    memory_budget_mb: float = INDEX_MEMORY_MB,
+    nprobe: int = INDEX_NPROBE,
+    ef_search: int = INDEX_EF_SEARCH
+):
+    """
+    Build, train and fill a FAISS index for `embeddings`.
+    Returns (index, info) where info describes the chosen configuration
+    and is persisted next to the index.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    n, dim = embeddings.shape
+
+    if index_type == "auto":
+        index_type = choose_index_type(n, dim, memory_budget_mb)
+    spec = factory_string(index_type, n, dim)
+
+    index = faiss.index_factory(dim, spec)
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add(embeddings)
+    tune_index(index, nprobe=nprobe, ef_search=ef_search)
+
+    info: Dict[str, Any] = {
+        "type": index_type,
+        "factory": spec,
+        "dim": dim,
+        "ntotal": int(index.ntotal),
+        "nprobe": nprobe,
+        "ef_search": ef_search
+    }
+    print(f"[INFO] Built {spec} index over {n} vectors")
+    return index, info
@@ -0,0 +1,200 @@
+# src/index_manager.py
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.vectorstore import FaissVectorStore
+from src.embedding_models import DEFAULT_EMBEDDING_MODEL
+
+# How many per-DPR indexes may stay resident in memory at once
+MAX_RESIDENT_INDEXES = int(os.getenv("MAX_RESIDENT_INDEXES", "16"))
+
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# builds of the same DPR id are serialised on one of these striped locks
+BUILD_LOCK_STRIPES = 64
+
+# {"dpr_id", "updated"} of the most recent build, shared by every process on the store
+LATEST_FILE = "latest.json"
+
+
+class InvalidDPRId(ValueError):
+    """A DPR id that cannot name an index namespace (API: 400)."""
+
+
+class IndexManager:
+    """
+    Per-DPR FAISS namespaces under `<root>/<dpr_id>/` with LRU residency.
+
+    Only the `capacity` most recently used indexes are kept in memory;
+    older ones are dropped and transparently reloaded from disk on next
+    access. Each namespace also carries a small manifest.json describing
+    the source PDF.
+    """
+
+    def __init__(self, root: str = "dpr_faiss_store", capacity: int = MAX_RESIDENT_INDEXES, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        self.root = root
+        self.capacity = max(1, capacity)
+        self.model_name = model_name
+        self._resident: "OrderedDict[str, FaissVectorStore]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = [threading.Lock() for _ in range(BUILD_LOCK_STRIPES)]
+        os.makedirs(self.root, exist_ok=True)
+
+    # -------------------------
+    # Paths / manifest
+    # -------------------------
+    def path(self, dpr_id: str) -> str:
+        if not _ID_RE.match(dpr_id or ""):
+            raise InvalidDPRId(f"Invalid DPR id: {dpr_id!r}")
+        return os.path.join(self.root, dpr_id)
+
+    def exists(self, dpr_id: str) -> bool:
+        return os.path.exists(os.path.join(self.path(dpr_id), "manifest.json"))
+
+    def manifest(self, dpr_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path(dpr_id), "manifest.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_manifest(self, dpr_id: str, **fields):
+        manifest = self.manifest(dpr_id) or {"dpr_id": dpr_id, "created": time.time()}
+        manifest.update(fields)
+        manifest["updated"] = time.time()
+        path = os.path.join(self.path(dpr_id), "manifest.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        latest = self._read_latest()
+        if latest is None or manifest["updated"] >= latest.get("updated", 0):
+            self._write_latest(dpr_id, manifest["updated"])
+
+    def _write_json(self, dpr_id: str, name: str, data: Dict[str, Any]):
+        path = os.path.join(self.path(dpr_id), name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, default=str)
+        os.replace(path + ".tmp", path)
+
+    def _read_json(self, dpr_id: str, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path(dpr_id), name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_evaluation(self, dpr_id: str, result: Dict[str, Any]):
+        """Persist the evaluation next to the index so identical uploads can reuse it."""
+        self._write_json(dpr_id, "evaluation.json", result)
+
+    def load_evaluation(self, dpr_id: str) -> Optional[Dict[str, Any]]:
+        return self._read_json(dpr_id, "evaluation.json")
+
+    def save_eval_state(self, dpr_id: str, state: Dict[str, Any]):
+        """Per-page hashes + issues and stage outputs for incremental re-evaluation."""
+        self._write_json(dpr_id, "eval_state.json", state)
+
+    def load_eval_state(self, dpr_id: str) -> Optional[Dict[str, Any]]:
+        return self._read_json(dpr_id, "eval_state.json")
+
+    def save_sections(self, dpr_id: str, sections: Dict[str, Any]):
+        """Section index (title -> page / character ranges) built at ingest."""
+        self._write_json(dpr_id, "sections.json", sections)
+
+    def load_sections(self, dpr_id: str) -> Optional[Dict[str, Any]]:
+        return self._read_json(dpr_id, "sections.json")
+
+    def list_ids(self) -> List[str]:
+        return sorted(d for d in os.listdir(self.root) if _ID_RE.match(d) and self.exists(d))
+
+    def latest(self) -> Optional[str]:
+        """
+        Most recently built DPR id, used when a caller does not pass one.
+        Read from the LATEST_FILE pointer, which every process's builds
+        keep current; manifests are scanned only if it is missing or stale.
+        """
+        latest = self._read_latest()
+        if latest and _ID_RE.match(str(latest.get("dpr_id", ""))) and self.exists(latest["dpr_id"]):
+            return latest["dpr_id"]
+        ids = [(m.get("updated", 0), d) for d in self.list_ids() if (m := self.manifest(d))]
+        if not ids:
+            return None
+        updated, dpr_id = max(ids)
+        self._write_latest(dpr_id, updated)
+        return dpr_id
+
+    def _read_latest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.root, LATEST_FILE), "r", encoding="utf-8") as f:
+                latest = json.load(f)
+            return latest if isinstance(latest, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def _write_latest(self, dpr_id: str, updated: float):
+        # per-process temp name + os.replace: readers never see a partial pointer
+        path = os.path.join(self.root, LATEST_FILE)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dpr_id": dpr_id, "updated": updated}, f)
+        os.replace(tmp, path)
+
+    # -------------------------
+    # Residency
+    # -------------------------
+    def _admit(self, dpr_id: str, store: FaissVectorStore):
+        # caller holds self._lock
+        self._resident[dpr_id] = store
+        self._resident.move_to_end(dpr_id)
+        while len(self._resident) > self.capacity:
+            evicted, _ = self._resident.popitem(last=False)
+            print(f"[INFO] Evicted FAISS index {evicted} from memory")
+
+    def get(self, dpr_id: str) -> Optional[FaissVectorStore]:
+        """Return the resident store for dpr_id, loading it from disk if needed."""
+        with self._lock:
+            store = self._resident.get(dpr_id)
+            if store is not None:
+                self._resident.move_to_end(dpr_id)
+                return store
+
+        if not self.exists(dpr_id):
+            return None
+
+        store = FaissVectorStore(self.path(dpr_id), self.model_name)
+        if not store.safe_load():
+            return None
+
+        with self._lock:
+            # another thread may have loaded it meanwhile; keep the first one
+            existing = self._resident.get(dpr_id)
+            if existing is not None:
+                self._resident.move_to_end(dpr_id)
+                return existing
+            self._admit(dpr_id, store)
+        return store
+
+    def build(self, dpr_id: str, docs, **manifest) -> FaissVectorStore:
+        """Build, persist and admit a fresh index for dpr_id."""
+        store = FaissVectorStore(self.path(dpr_id), self.model_name)
+        store.build_from_documents(docs)
+        store.save()
+        self.write_manifest(dpr_id, **manifest)
+
+        with self._lock:
+            self._admit(dpr_id, store)
+        return store
+
+    def build_lock(self, dpr_id: str) -> threading.Lock:
+        """Hold around get-or-build so concurrent jobs for one DPR build its index once."""
+        return self._build_locks[hash(dpr_id) % BUILD_LOCK_STRIPES]
+
+    def resident_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._resident)
@@ -0,0 +1,161 @@
+# src/jobs.py
+import os
+import time
+import uuid
+import queue
+import threading
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "16"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, name: str, meta: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.meta = meta or {}
+        self.status = "queued"          # queued | running | done | failed
+        self.stages: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def stage_event(self, stage: str, status: str):
+        """Progress hook: status is pending | running | done | failed."""
+        now = time.time()
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"status": "pending"})
+            entry["status"] = status
+            if status == "running":
+                entry["started"] = now
+            elif status != "pending":
+                entry["finished"] = now
+                if "started" in entry:
+                    entry["duration_s"] = round(now - entry["started"], 3)
+
+    @contextmanager
+    def stage(self, name: str):
+        self.stage_event(name, "running")
+        try:
+            yield
+        except Exception:
+            self.stage_event(name, "failed")
+            raise
+        self.stage_event(name, "done")
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {k: dict(v) for k, v in self.stages.items()}
+        done = sum(1 for s in stages.values() if s["status"] == "done")
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            **self.meta,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "stages_done": done,
+            "stages_total": len(stages),
+            "stages": stages,
+            "error": self.error
+        }
+
+
+class JobQueue:
+    """
+    Bounded in-process job queue with a fixed pool of worker threads.
+
+    submit() returns immediately with a Job that callers can poll; it
+    raises QueueFull once `max_depth` jobs are waiting. Job functions are
+    called as fn(job, *args) and can report progress via job.stage(...)
+    or job.stage_event(...). Only the last `history` jobs are retained.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_depth: int = JOB_QUEUE_DEPTH, history: int = JOB_HISTORY):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.history = history
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_depth)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, name: str, fn: Callable[..., Any], *args, meta: Optional[Dict[str, Any]] = None, key: Optional[str] = None) -> Job:
+        """
+        Enqueue fn(job, *args). If `key` is given and a job with the same
+        key is still queued or running, that job is returned instead.
+        """
+        with self._lock:
+            if key is not None:
+                active = self._active.get(key)
+                if active is not None and active.status in ("queued", "running"):
+                    return active
+
+            job = Job(name, meta)
+            try:
+                self._queue.put_nowait((job, fn, args))
+            except queue.Full:
+                raise QueueFull(f"Job queue is full ({self.max_depth} waiting)")
+
+            if key is not None:
+                self._active[key] = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status in ("queued", "running"):
+                    break
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = sum(1 for j in self._jobs.values() if j.status == "running")
+        return {
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "queued": self._queue.qsize(),
+            "running": running
+        }
+
+    def _run(self):
+        while True:
+            job, fn, args = self._queue.get()
+            job.status = "running"
+            job.started = time.time()
+            print(f"[INFO] Job {job.id} ({job.name}) started")
+            try:
+                job.result = fn(job, *args)
+                job.status = "done"
+            except Exception as e:
+                traceback.print_exc()
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished = time.time()
+                with self._lock:
+                    for key in [k for k, j in self._active.items() if j is job]:
+                        del self._active[key]
+                self._queue.task_done()
+            print(f"[INFO] Job {job.id} {job.status} in {job.finished - job.started:.1f}s")
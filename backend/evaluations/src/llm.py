@@ -0,0 +1,166 @@
+# src/llm.py
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List
+from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+
+from src.cache import CACHE_DIR, LRUCache, SQLiteCache, TieredCache
+
+load_dotenv()
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "50000"))
+
+# Client options that change how a call is made, not what it returns
+TRANSPORT_PARAMS = {"timeout", "max_retries"}
+
+_cache = TieredCache(
+    LRUCache(max_entries=512, ttl=LLM_CACHE_TTL),
+    SQLiteCache(
+        os.path.join(CACHE_DIR, "llm.sqlite"),
+        ttl=LLM_CACHE_TTL,
+        max_entries=LLM_CACHE_SIZE
+    )
+)
+
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+    stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def _message_key(m: Any) -> Any:
+    if isinstance(m, str):
+        return m
+    return [getattr(m, "type", type(m).__name__), getattr(m, "content", str(m))]
+
+
+class LLMResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class CachedLLM:
+    """
+    Drop-in replacement for ChatGroq.invoke() shared by every caller.
+
+    Responses are content-addressed: sha256 over model + generation
+    parameters + messages. Repeats are served from a persistent tiered
+    cache, and concurrent identical prompts are collapsed into a single
+    upstream call (singleflight). Errors are never cached.
+    """
+
+    def __init__(self, model: str, max_tokens: int, **params):
+        self.model = model
+        self.params = {"max_tokens": max_tokens, **params}
+        self.client = ChatGroq(
+            model=model,
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            **self.params
+        )
+
+    def cache_key(self, messages: List[Any]) -> str:
+        payload = json.dumps({
+            "model": self.model,
+            "params": {k: v for k, v in self.params.items() if k not in TRANSPORT_PARAMS},
+            "messages": [_message_key(m) for m in messages]
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def invoke(self, messages: List[Any]) -> LLMResponse:
+        key = self.cache_key(messages)
+
+        content = _cache.get(key)
+        if content is not None:
+            _count("hits")
+            return LLMResponse(content)
+
+        with _inflight_lock:
+            fut = _inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                _inflight[key] = fut
+
+        if not leader:
+            _count("coalesced")
+            return LLMResponse(fut.result())
+
+        _count("misses")
+        try:
+            # a previous leader may have filled the cache since our lookup
+            content = _cache.get(key)
+            if content is None:
+                content = self.client.invoke(messages).content
+                _cache.set(key, content)
+            fut.set_result(content)
+        except Exception as e:
+            _count("errors")
+            fut.set_exception(e)
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+
+        return LLMResponse(content)
+
+    def stream(self, messages: List[Any]) -> Iterator[str]:
+        """
+        Yield the completion as it is generated. A cached response is
+        yielded in one piece; a fresh one is cached once fully received.
+        Streams are not coalesced.
+        """
+        key = self.cache_key(messages)
+
+        content = _cache.get(key)
+        if content is not None:
+            _count("hits")
+            yield content
+            return
+
+        _count("misses")
+        parts = []
+        try:
+            for chunk in self.client.stream(messages):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+        except Exception:
+            _count("errors")
+            raise
+        _cache.set(key, "".join(parts))
+
+
+_clients: Dict[str, CachedLLM] = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm(model: str, max_tokens: int, **params) -> CachedLLM:
+    """
+    Return the shared CachedLLM for this model + parameter set.
+    """
+    key = json.dumps({"model": model, "max_tokens": max_tokens, **params}, sort_keys=True, default=str)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = CachedLLM(model, max_tokens, **params)
+            _clients[key] = client
+        return client
@@ -0,0 +1,290 @@
+# src/monte_carlo.py
+"""
+Chunked Monte Carlo engine for cost / schedule risk.
+
+Cost is the sum of correlated lognormal cost heads (BOQ items or cost
+groups); duration is one more lognormal, optionally correlated with
+cost. Correlation is imposed on normal scores through the Cholesky
+factor of the correlation matrix (a Gaussian copula).
+
+Draws are generated and reduced chunk by chunk: each chunk updates
+streaming moments and a QuantileSketch, so memory is bounded by the
+chunk size rather than n_sims, and every percentile is read from the
+sketch in one pass at the end.
+
+Samplers: "random" (pseudo-random normals), "lhs" (Latin hypercube per
+chunk) and "sobol" (scrambled Sobol sequence; needs scipy, otherwise
+falls back to "lhs").
+"""
+import os
+import math
+import warnings
+import numpy as np
+from typing import List, Sequence, Tuple
+
+try:
+    from scipy.stats import qmc as _qmc
+    from scipy.special import ndtri as _scipy_ndtri
+except ImportError:
+    _qmc = None
+    _scipy_ndtri = None
+
+# simulations generated and reduced at a time (a power of two suits Sobol)
+MC_CHUNK_SIZE = int(os.getenv("MC_CHUNK_SIZE", str(2 ** 16)))
+# relative accuracy of the quantile sketch
+MC_SKETCH_ALPHA = float(os.getenv("MC_SKETCH_ALPHA", "0.0002"))
+
+SAMPLERS = ("random", "lhs", "sobol")
+
+
+# -------------------------
+# Streaming statistics
+# -------------------------
+class QuantileSketch:
+    """
+    DDSketch-style quantile sketch with relative accuracy `alpha`.
+
+    Values are counted in logarithmic buckets (bucket k covers
+    (gamma^(k-1), gamma^k] with gamma = (1+alpha)/(1-alpha)), kept in
+    dense count arrays for positive and negative values, so any quantile
+    is within alpha (relative) of the exact one and memory grows with
+    the log of the value range, not with the number of values.
+    Count, mean and variance are tracked exactly alongside.
+    """
+
+    MIN_VALUE = 1e-9   # smaller magnitudes are counted as zero
+
+    def __init__(self, alpha: float = MC_SKETCH_ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self._stores = {1: (np.zeros(0, dtype=np.int64), 0), -1: (np.zeros(0, dtype=np.int64), 0)}
+        self.zero_count = 0
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _add_keys(self, sign: int, keys: np.ndarray):
+        counts, offset = self._stores[sign]
+        lo, hi = int(keys.min()), int(keys.max())
+        if counts.size == 0:
+            counts, offset = np.zeros(hi - lo + 1, dtype=np.int64), lo
+        elif lo < offset or hi >= offset + counts.size:
+            new_lo, new_hi = min(lo, offset), max(hi, offset + counts.size - 1)
+            grown = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+            grown[offset - new_lo:offset - new_lo + counts.size] = counts
+            counts, offset = grown, new_lo
+        counts += np.bincount(keys - offset, minlength=counts.size)
+        self._stores[sign] = (counts, offset)
+
+    def add(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+
+        # exact moments, merged per chunk (Chan et al.)
+        n = values.size
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += chunk_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        mag = np.abs(values)
+        small = mag < self.MIN_VALUE
+        self.zero_count += int(small.sum())
+        keys = np.ceil(np.log(np.where(small, 1.0, mag)) / self._log_gamma).astype(np.int64)
+        for sign, mask in ((1, (values > 0) & ~small), (-1, (values < 0) & ~small)):
+            if mask.any():
+                self._add_keys(sign, keys[mask])
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else math.nan
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """All requested quantiles (0..1) from one cumulative pass over the buckets."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if not self.count:
+            return np.full(qs.shape, np.nan)
+
+        neg_counts, neg_off = self._stores[-1]
+        pos_counts, pos_off = self._stores[1]
+        bucket_value = lambda keys: 2.0 * self.gamma ** keys / (self.gamma + 1.0)
+
+        # ascending order: large negatives, ..., zero, ..., large positives
+        values = np.concatenate([
+            -bucket_value(np.arange(neg_off, neg_off + neg_counts.size))[::-1],
+            [0.0],
+            bucket_value(np.arange(pos_off, pos_off + pos_counts.size))
+        ])
+        counts = np.concatenate([neg_counts[::-1], [self.zero_count], pos_counts])
+        cum = np.cumsum(counts)
+
+        ranks = np.clip(qs, 0.0, 1.0) * (self.count - 1)
+        idx = np.searchsorted(cum, ranks, side="right")
+        return np.clip(values[np.minimum(idx, values.size - 1)], self.min, self.max)
+
+    def quantile_ci(self, qs: Sequence[float], confidence: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distribution-free confidence interval of each quantile: the
+        order statistics at q -/+ z * sqrt(q(1-q)/n) (normal approximation
+        of the binomial rank). Exact for independent draws, conservative
+        for LHS / Sobol.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        z = float(_ndtri(np.array([0.5 + confidence / 2]))[0])
+        half = z * np.sqrt(qs * (1 - qs) / max(self.count, 1))
+        return self.quantiles(qs - half), self.quantiles(qs + half)
+
+
+# -------------------------
+# Sampling
+# -------------------------
+def _ndtri_acklam(p: np.ndarray) -> np.ndarray:
+    """Inverse standard normal CDF (Acklam's rational approximation, rel. error < 1.2e-9)."""
+    a = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+    p_low = 0.02425
+
+    out = np.empty_like(p)
+    lo, hi = p < p_low, p > 1 - p_low
+    mid = ~(lo | hi)
+
+    q = p[mid] - 0.5
+    r = q * q
+    out[mid] = ((((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q /
+                (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1))
+
+    for mask, sign, tail in ((lo, 1.0, p[lo]), (hi, -1.0, 1 - p[hi])):
+        q = np.sqrt(-2 * np.log(tail))
+        out[mask] = sign * ((((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) /
+                            ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1))
+    return out
+
+
+def _ndtri(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return _scipy_ndtri(p) if _scipy_ndtri is not None else _ndtri_acklam(p)
+
+
+class _NormalSampler:
+    """Independent standard normal scores, `dims` columns, one chunk at a time."""
+
+    def __init__(self, dims: int, sampler: str, seed: int):
+        if sampler not in SAMPLERS:
+            raise ValueError(f"Unknown sampler {sampler!r} (expected one of {SAMPLERS})")
+        if sampler == "sobol" and _qmc is None:
+            print("[WARN] scipy not installed; using Latin hypercube instead of Sobol")
+            sampler = "lhs"
+        self.dims = dims
+        self.sampler = sampler
+        self.rng = np.random.default_rng(seed)
+        self._sobol = _qmc.Sobol(dims, scramble=True, seed=seed) if sampler == "sobol" else None
+
+    def draw(self, n: int) -> np.ndarray:
+        if self.sampler == "random":
+            return self.rng.standard_normal((n, self.dims))
+        if self.sampler == "lhs":
+            # one stratum per draw in every dimension, strata shuffled independently
+            strata = np.argsort(self.rng.random((n, self.dims)), axis=0)
+            return _ndtri((strata + self.rng.random((n, self.dims))) / n)
+        with warnings.catch_warnings():
+            # partial chunks are not powers of two; the sequence stays valid
+            warnings.simplefilter("ignore", UserWarning)
+            return _ndtri(self._sobol.random(n))
+
+
+def lognorm_params(mean, cv) -> Tuple[np.ndarray, np.ndarray]:
+    """mu, sigma of a lognormal with the given mean and coefficient of variation."""
+    sigma = np.sqrt(np.log1p(np.asarray(cv, dtype=np.float64) ** 2))
+    mu = np.log(np.asarray(mean, dtype=np.float64)) - 0.5 * sigma ** 2
+    return mu, sigma
+
+
+def correlation_factor(n_heads: int, correlation=0.0, duration_corr: float = 0.0) -> np.ndarray:
+    """
+    Lower Cholesky factor of the (cost heads + duration) correlation
+    matrix. `correlation` is a scalar (same for every pair of heads) or
+    an n_heads x n_heads matrix. A matrix that is not positive definite
+    is replaced by its nearest correlation matrix (eigenvalues clipped).
+    """
+    k = n_heads
+    corr = np.eye(k + 1)
+    if np.isscalar(correlation):
+        corr[:k, :k] = correlation
+    else:
+        given = np.asarray(correlation, dtype=np.float64)
+        if given.shape != (k, k):
+            raise ValueError(f"correlation must be a scalar or a {k}x{k} matrix, got {given.shape}")
+        corr[:k, :k] = given
+    corr[k, :k] = corr[:k, k] = duration_corr
+    np.fill_diagonal(corr, 1.0)
+
+    try:
+        return np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        print("[WARN] Correlation matrix is not positive definite; using the nearest valid one")
+        w, v = np.linalg.eigh((corr + corr.T) / 2)
+        fixed = (v * np.maximum(w, 1e-10)) @ v.T
+        scale = np.sqrt(np.diag(fixed))
+        return np.linalg.cholesky(fixed / np.outer(scale, scale))
+
+
+# -------------------------
+# Engine
+# -------------------------
+class Simulation:
+    """
+    Total cost (sum of (mean, cv) lognormal heads) and duration ((mean,
+    cv) lognormal), accumulated into `cost` / `duration` sketches.
+    run() can be called repeatedly to extend the same simulation, e.g.
+    batch by batch until the estimates converge.
+    """
+
+    def __init__(self, cost_heads: List[Tuple[float, float]], duration: Tuple[float, float],
+                 correlation=0.0, duration_corr: float = 0.0, sampler: str = "random", seed: int = 42,
+                 chunk_size: int = MC_CHUNK_SIZE, alpha: float = MC_SKETCH_ALPHA):
+        self.k = len(cost_heads)
+        self.mu, self.sigma = lognorm_params([m for m, _ in cost_heads] + [duration[0]],
+                                             [cv for _, cv in cost_heads] + [duration[1]])
+        self.chol = correlation_factor(self.k, correlation, duration_corr)
+        self.normals = _NormalSampler(self.k + 1, sampler, seed)
+        self.chunk_size = chunk_size
+        self.cost = QuantileSketch(alpha)
+        self.duration = QuantileSketch(alpha)
+
+    @property
+    def sampler(self) -> str:
+        """The sampler actually used (sobol falls back to lhs without scipy)."""
+        return self.normals.sampler
+
+    @property
+    def n_sims(self) -> int:
+        return self.cost.count
+
+    def run(self, n_sims: int) -> "Simulation":
+        """Add `n_sims` more draws, `chunk_size` at a time."""
+        for start in range(0, n_sims, self.chunk_size):
+            z = self.normals.draw(min(self.chunk_size, n_sims - start)) @ self.chol.T
+            x = np.exp(self.mu + self.sigma * z)
+            self.cost.add(x[:, :self.k].sum(axis=1))
+            self.duration.add(x[:, self.k])
+        return self
+
+
+def simulate(cost_heads: List[Tuple[float, float]], duration: Tuple[float, float], n_sims: int,
+             **options) -> Simulation:
+    """Simulation(cost_heads, duration, **options) run for `n_sims` draws."""
+    return Simulation(cost_heads, duration, **options).run(n_sims)
@@ -0,0 +1,92 @@
+# src/monte_carlo_benchmark.py
+"""
+Chunked Monte Carlo engine vs the original run_monte_carlo: time, peak
+memory and accuracy.
+
+A single cost head is used so the exact lognormal percentiles are known;
+the table shows the worst relative error of P10 / P50 / P90 (cost and
+duration) for the reference implementation and for each sampler of the
+new engine, at each simulation count.
+
+With --rel-tol, also runs the adaptive mode per sampler: simulations
+needed to reach the target, achieved CI half-width, and the cost of a
+repeated (memoized) call.
+
+    python -m src.monte_carlo_benchmark --sims 2000,100000,1000000,10000000 --rel-tol 0.01
+"""
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+from src.monte_carlo import SAMPLERS, lognorm_params, _ndtri
+from src.risk_simulator import run_monte_carlo, run_monte_carlo_reference
+
+BASE_COST = 5e7
+COST_CV = 0.2
+BASE_DAYS = 365
+DURATION_CV = 0.25
+QS = np.array([0.1, 0.5, 0.9])
+
+
+def exact_percentiles(mean: float, cv: float) -> np.ndarray:
+    mu, sigma = lognorm_params(mean, cv)
+    return np.exp(mu + sigma * _ndtri(QS))
+
+
+def max_error_pct(summary) -> float:
+    got_cost = np.array([summary["cost"][k] for k in ("p10", "p50", "p90")])
+    got_days = np.array([summary["duration"][k] for k in ("p10_days", "p50_days", "p90_days")])
+    err_cost = np.abs(got_cost / exact_percentiles(BASE_COST, COST_CV) - 1)
+    err_days = np.abs(got_days / exact_percentiles(BASE_DAYS, DURATION_CV) - 1)
+    return float(max(err_cost.max(), err_days.max()) * 100)
+
+
+def measured(fn, **kwargs):
+    tracemalloc.start()
+    t = time.perf_counter()
+    summary = fn(BASE_COST, cost_cv=COST_CV, base_duration_days=BASE_DAYS, duration_cv=DURATION_CV, **kwargs)
+    seconds = time.perf_counter() - t
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summary, seconds, peak / 1e6
+
+
+def run(sims, max_reference: int):
+    print(f"{'n_sims':>10}  {'engine':<10}{'seconds':>9}{'peak MB':>10}{'max err %':>11}")
+    for n in sims:
+        rows = []
+        if n <= max_reference:
+            rows.append(("reference",) + measured(run_monte_carlo_reference, n_sims=n))
+        for sampler in SAMPLERS:
+            summary, seconds, peak = measured(run_monte_carlo, n_sims=n, sampler=sampler)
+            rows.append((summary["sampler"] if summary["sampler"] == sampler else f"{sampler}*", summary, seconds, peak))
+        for name, summary, seconds, peak in rows:
+            print(f"{n:>10,}  {name:<10}{seconds:>9.3f}{peak:>10.1f}{max_error_pct(summary):>11.3f}")
+    print("* sampler unavailable (scipy not installed), fell back to lhs")
+
+
+def run_adaptive(rel_tol: float):
+    print(f"\nadaptive, rel_tol {rel_tol}")
+    print(f"{'sampler':<10}{'n_sims':>10}{'CI +/- %':>10}{'seconds':>9}{'cached us':>11}{'max err %':>11}")
+    for sampler in SAMPLERS:
+        kwargs = dict(n_sims=0, sampler=sampler, rel_tol=rel_tol)
+        summary, seconds, _ = measured(run_monte_carlo, **kwargs)
+        _, cached, _ = measured(run_monte_carlo, **kwargs)
+        name = summary["sampler"] if summary["sampler"] == sampler else f"{sampler}*"
+        print(f"{name:<10}{summary['n_sims']:>10,}{summary['ci_rel_halfwidth'] * 100:>10.3f}"
+              f"{seconds:>9.3f}{cached * 1e6:>11.0f}{max_error_pct(summary):>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sims", default="2000,100000,1000000,10000000",
+                        help="comma-separated simulation counts")
+    parser.add_argument("--max-reference", type=int, default=10000000,
+                        help="skip the reference implementation above this many simulations (memory)")
+    parser.add_argument("--rel-tol", type=float, default=None,
+                        help="also benchmark the adaptive mode at this relative tolerance")
+    args = parser.parse_args()
+    run([int(s) for s in args.sims.split(",")], args.max_reference)
+    if args.rel_tol:
+        run_adaptive(args.rel_tol)
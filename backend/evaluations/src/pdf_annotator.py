@@ -1,12 +1,50 @@
 import fitz
 import os
+import re
 import uuid
 
+_PUNCT_RE = re.compile(r"^\W+|\W+$")
+
+
+def _norm(word):
+    return _PUNCT_RE.sub("", word.lower())
+
+
+# --------------------------------------------------------------------
+# Locate snippet using pre-extracted word boxes (no page re-search)
+# --------------------------------------------------------------------
+def find_snippet_rects(words, snippet):
+    """
+    Match the snippet's words against the page's word boxes and return one
+    rect per text line covered by each match. Case and surrounding
+    punctuation are ignored. Returns [] when the snippet is not found.
+    """
+    target = [w for w in (_norm(t) for t in snippet.split()) if w]
+    if not target:
+        return []
+
+    norm_words = [_norm(w[4]) for w in words]
+    rects = []
+    n, m = len(words), len(target)
+    i = 0
+    while i <= n - m:
+        if norm_words[i] == target[0] and norm_words[i:i + m] == target:
+            lines = {}
+            for w in words[i:i + m]:
+                r = fitz.Rect(w[:4])
+                key = (w[5], w[6])   # block, line
+                lines[key] = lines[key] | r if key in lines else r
+            rects.extend(lines.values())
+            i += m
+        else:
+            i += 1
+    return rects
+
 
 # --------------------------------------------------------------------
 # Highlight issue on *page*
 # --------------------------------------------------------------------
-def highlight_issue_on_page(page, snippet, severity, comment_text):
+def highlight_issue_on_page(page, snippet, severity, comment_text, rects=None):
     """
     Adds highlight + attached comment to a specific page.
     Fully compatible with ALL PyMuPDF versions.
@@ -20,10 +58,11 @@ def highlight_issue_on_page(page, snippet, severity, comment_text):
 
     color = color_map.get(severity, (0, 0.5, 1))
 
-    try:
-        rects = page.search_for(snippet)
-    except Exception:
-        return
+    if not rects:
+        try:
+            rects = page.search_for(snippet)
+        except Exception:
+            return
 
     for rect in rects:
         try:
@@ -68,13 +107,16 @@ AI ISSUE SEVERITY LEGEND
 # --------------------------------------------------------------------
 # Master function: Annotate full PDF
 # --------------------------------------------------------------------
-def annotate_pdf(input_path, issues):
+def annotate_pdf(input_path, issues, document=None):
     """
     Adds:
       - legend on first page
       - highlights
       - comments
     Produces an annotated PDF in /annotated/
+
+    `document` (an ExtractedDocument) supplies word boxes so snippets are
+    located without searching the page again.
     """
 
     doc = fitz.open(input_path)
@@ -101,7 +143,8 @@ def annotate_pdf(input_path, issues):
                 continue
 
             page = doc[page_number]
-            highlight_issue_on_page(page, snippet, severity, comment_text)
+            rects = find_snippet_rects(document.words[page_number], snippet) if document else None
+            highlight_issue_on_page(page, snippet, severity, comment_text, rects=rects)
 
         except Exception as e:
             print("[ANNOTATION ERROR]", e)
@@ -0,0 +1,151 @@
+# src/pdf_document.py
+import os
+import hashlib
+import fitz
+from collections import Counter
+from typing import List, Tuple
+from langchain_core.documents import Document
+
+from src.cache import LRUCache
+
+# (x0, y0, x1, y1, word, block_no, line_no, word_no) as returned by PyMuPDF
+WordBox = Tuple[float, float, float, float, str, int, int, int]
+
+# (page, line text, font size, bold) for lines that look like headings
+HeadingLine = Tuple[int, str, float, bool]
+
+# lines this much larger than body text (or bold) are heading candidates
+HEADING_SIZE_RATIO = 1.15
+HEADING_MAX_CHARS = 120
+
+PAGE_SEPARATOR = "\n\n"
+
+# PDF_CACHE_SIZE documents, each stored under its digest and its stat key
+_documents = LRUCache(max_entries=2 * int(os.getenv("PDF_CACHE_SIZE", "8")))
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ExtractedDocument:
+    """
+    Everything the pipeline needs from a DPR PDF, parsed once with PyMuPDF:
+    page texts, word boxes, outline, heading candidates and page count.
+    `text` joins the pages with PAGE_SEPARATOR and `page_offsets[i]` is
+    where page i starts in it.
+    """
+
+    def __init__(self, path: str, sha256: str, pages: List[str], words: List[List[WordBox]],
+                 toc: List[list] | None = None, headings: List[HeadingLine] | None = None,
+                 body_size: float = 0.0):
+        self.path = path
+        self.sha256 = sha256
+        self.pages = pages
+        self.words = words
+        self.toc = toc or []              # [level, title, 1-based page] from the PDF outline
+        self.headings = headings or []
+        self.body_size = body_size        # most common font size, weighted by characters
+        self.page_count = len(pages)
+
+        self.page_offsets = []
+        pos = 0
+        for text in pages:
+            self.page_offsets.append(pos)
+            pos += len(text) + len(PAGE_SEPARATOR)
+
+        self._text = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = PAGE_SEPARATOR.join(self.pages)
+        return self._text
+
+    def to_documents(self) -> List[Document]:
+        """LangChain page documents (same metadata shape as PyPDFLoader)."""
+        return [
+            Document(page_content=text, metadata={"source": self.path, "page": i})
+            for i, text in enumerate(self.pages)
+        ]
+
+
+def _page_lines(page) -> List[Tuple[str, float, bool]]:
+    """(text, max font size, all-bold) per text line of a page."""
+    lines = []
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for line in block.get("lines", []):
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if not spans:
+                continue
+            text = " ".join("".join(s["text"] for s in spans).split())
+            size = max(s["size"] for s in spans)
+            bold = all(s["flags"] & 16 or "bold" in s["font"].lower() for s in spans)
+            lines.append((text, size, bold))
+    return lines
+
+
+def _heading_candidates(page_lines: List[List[Tuple[str, float, bool]]]) -> Tuple[List[HeadingLine], float]:
+    sizes = Counter()
+    for lines in page_lines:
+        for text, size, _ in lines:
+            sizes[round(size * 2) / 2] += len(text)
+    body = sizes.most_common(1)[0][0] if sizes else 0.0
+
+    headings = []
+    for p, lines in enumerate(page_lines):
+        for text, size, bold in lines:
+            if len(text) > HEADING_MAX_CHARS or not any(c.isalpha() for c in text):
+                continue
+            if size >= body * HEADING_SIZE_RATIO or (bold and size >= body):
+                headings.append((p, text, size, bold))
+    return headings, body
+
+
+def _stat_key(path: str) -> str:
+    st = os.stat(path)
+    return f"stat:{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def extract_document(path: str, sha256: str | None = None) -> ExtractedDocument:
+    """
+    Parse `path` once and cache the result, so the loader, evaluator and
+    annotator all share one extraction.
+
+    Pass `sha256` when the caller already knows the file's digest (e.g.
+    hashed while uploading). Without it the cache is keyed on
+    (path, mtime, size) and the file is only hashed on a miss.
+    """
+    stat_key = _stat_key(path)
+    doc = _documents.get(sha256) if sha256 else None
+    if doc is None:
+        doc = _documents.get(stat_key)
+    if doc is not None:
+        return doc
+    sha = sha256 or file_sha256(path)
+    doc = _documents.get(sha)
+    if doc is not None:
+        _documents.set(stat_key, doc)
+        return doc
+
+    pdf = fitz.open(path)
+    try:
+        pages, words, lines = [], [], []
+        toc = pdf.get_toc(simple=True)
+        for page in pdf:
+            pages.append(page.get_text())
+            words.append([tuple(w) for w in page.get_text("words")])
+            lines.append(_page_lines(page))
+    finally:
+        pdf.close()
+
+    headings, body_size = _heading_candidates(lines)
+    doc = ExtractedDocument(path, sha, pages, words, toc=toc, headings=headings, body_size=body_size)
+    _documents.set(sha, doc)
+    _documents.set(stat_key, doc)
+    print(f"[INFO] Extracted {doc.page_count} pages from {path}")
+    return doc
@@ -0,0 +1,118 @@
+# src/pipeline.py
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable[..., Any], deps: Iterable[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+class StageGraph:
+    """
+    Minimal dependency-graph scheduler.
+
+    Each stage declares the stages it consumes; its function is called with
+    those results as keyword arguments (dep name -> value). Stages whose
+    inputs are ready run concurrently on a thread pool, so total latency is
+    roughly the critical path instead of the sum of all stages.
+
+        g = StageGraph()
+        g.add("boq", parse_boq)
+        g.add("risk", lambda boq: simulate(boq), deps=["boq"])
+        results, timings = g.run()
+
+    Stage names that are not valid identifiers can still be consumed by
+    declaring the function with **kwargs.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self.stages: Dict[str, Stage] = {}
+
+    def add(self, name: str, fn: Callable[..., Any], deps: Iterable[str] = ()) -> str:
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        self.stages[name] = Stage(name, fn, deps)
+        return name
+
+    def _check(self):
+        for st in self.stages.values():
+            for d in st.deps:
+                if d not in self.stages:
+                    raise ValueError(f"Stage '{st.name}' depends on unknown stage '{d}'")
+
+        # cycle check (Kahn)
+        indeg = {n: len(st.deps) for n, st in self.stages.items()}
+        ready = [n for n, k in indeg.items() if k == 0]
+        seen = 0
+        while ready:
+            n = ready.pop()
+            seen += 1
+            for m, st in self.stages.items():
+                if n in st.deps:
+                    indeg[m] -= 1
+                    if indeg[m] == 0:
+                        ready.append(m)
+        if seen != len(self.stages):
+            raise ValueError("Stage graph contains a cycle")
+
+    def run(self, listener: Optional[Callable[[str, str], None]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Execute all stages. Returns (results, timings) where timings maps
+        stage name -> {"start_s", "duration_s"} relative to run start, plus
+        "_total_s". The first stage failure is re-raised.
+
+        `listener(stage, status)` is called with pending for every stage
+        up front, then running / done / failed as each stage progresses
+        (e.g. to report job progress).
+        """
+        notify = listener or (lambda stage, status: None)
+        for name in self.stages:
+            notify(name, "pending")
+        self._check()
+
+        results: Dict[str, Any] = {}
+        timings: Dict[str, Any] = {}
+        pending = dict(self.stages)
+        running = {}
+        t0 = time.perf_counter()
+
+        def execute(st: Stage):
+            start = time.perf_counter()
+            notify(st.name, "running")
+            try:
+                out = st.fn(**{d: results[d] for d in st.deps})
+                notify(st.name, "done")
+                return out
+            except Exception:
+                notify(st.name, "failed")
+                raise
+            finally:
+                end = time.perf_counter()
+                timings[st.name] = {
+                    "start_s": round(start - t0, 3),
+                    "duration_s": round(end - start, 3)
+                }
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in [n for n, st in pending.items() if all(d in results for d in st.deps)]:
+                    running[pool.submit(execute, pending.pop(name))] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    try:
+                        results[name] = fut.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        print(f"[ERROR] Stage '{name}' failed")
+                        raise
+
+        timings["_total_s"] = round(time.perf_counter() - t0, 3)
+        return results, timings
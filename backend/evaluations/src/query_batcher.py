@@ -0,0 +1,127 @@
+# src/query_batcher.py
+import os
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+from typing import Dict, List
+
+from src.cache import LRUCache
+from src.embedding_models import get_embedding_model, DEFAULT_EMBEDDING_MODEL
+
+QUERY_MAX_BATCH = int(os.getenv("QUERY_MAX_BATCH", "64"))
+QUERY_MAX_WAIT_MS = float(os.getenv("QUERY_MAX_WAIT_MS", "5"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+
+
+class QueryBatcher:
+    """
+    Micro-batching front end for query encoding + FAISS search.
+
+    Concurrent search() calls are queued; a background thread waits up to
+    `max_wait_ms` for up to `max_batch` queries, encodes all of them in a
+    single model call and runs one index.search per target index over the
+    whole query matrix. Query embeddings are kept in an in-memory LRU so
+    repeated questions skip the model entirely.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, max_batch: int = QUERY_MAX_BATCH,
+                 max_wait_ms: float = QUERY_MAX_WAIT_MS, cache_size: int = QUERY_CACHE_SIZE):
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._cache = LRUCache(max_entries=cache_size)
+        self._queue: "queue.Queue[tuple[object, str, int, Future]]" = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    # -------------------------
+    # Embedding (LRU + one model call for all misses)
+    # -------------------------
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vecs: Dict[str, np.ndarray] = {}
+        misses = []
+        for t in texts:
+            if t in vecs:
+                continue
+            v = self._cache.get(t)
+            if v is None:
+                misses.append(t)
+                vecs[t] = None
+            else:
+                vecs[t] = v
+
+        if misses:
+            encoded = np.asarray(get_embedding_model(self.model_name).encode(misses), dtype="float32")
+            for t, v in zip(misses, encoded):
+                vecs[t] = v
+                self._cache.set(t, v)
+
+        return np.vstack([vecs[t] for t in texts]).astype("float32") if texts else np.zeros((0, 0), "float32")
+
+    # -------------------------
+    # Micro-batched search
+    # -------------------------
+    def search(self, index, text: str, top_k: int):
+        """Blocking single-query search; batched with concurrent callers."""
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((index, text, top_k, fut))
+        return fut.result()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                    self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = self.embed([text for _, text, _, _ in batch])
+
+                # one search per target index over all of its queries
+                groups: Dict[int, List[int]] = {}
+                for i, (index, _, _, _) in enumerate(batch):
+                    groups.setdefault(id(index), []).append(i)
+
+                for rows in groups.values():
+                    index = batch[rows[0]][0]
+                    k = max(batch[i][2] for i in rows)
+                    D, I = index.search(vectors[rows], k)
+                    for j, i in enumerate(rows):
+                        top_k = batch[i][2]
+                        batch[i][3].set_result((D[j][:top_k], I[j][:top_k]))
+            except Exception as e:
+                for _, _, _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+
+_batchers: Dict[str, QueryBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_query_batcher(model_name: str = DEFAULT_EMBEDDING_MODEL) -> QueryBatcher:
+    with _batchers_lock:
+        batcher = _batchers.get(model_name)
+        if batcher is None:
+            batcher = QueryBatcher(model_name)
+            _batchers[model_name] = batcher
+        return batcher
@@ -1,8 +1,196 @@
 # src/risk_simulator.py
+import os
+import copy
 import numpy as np
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List, Sequence
+
+from src.monte_carlo import MC_CHUNK_SIZE, Simulation
+
+# default correlation between cost heads (they share market and site conditions)
+HEAD_CORRELATION = 0.5
+
+# memoized run_monte_carlo results (keyed on every parameter)
+MC_CACHE_SIZE = int(os.getenv("MC_CACHE_SIZE", "256"))
+
+# percentiles whose confidence intervals are reported / must converge
+CI_QUANTILES = (0.1, 0.5, 0.9)
+
 
 def run_monte_carlo(
+    base_cost: float,
+    cost_cv: float = 0.2,
+    base_duration_days: float = 365,
+    duration_cv: float = 0.25,
+    n_sims: int = 5000,
+    random_seed: int = 42,
+    cost_heads: Sequence[Any] | None = None,
+    correlation=HEAD_CORRELATION,
+    duration_corr: float = 0.0,
+    sampler: str = "random",
+    chunk_size: int = MC_CHUNK_SIZE,
+    rel_tol: float | None = None,
+    confidence: float = 0.95,
+    batch_size: int = 2000,
+    max_sims: int = 1000000
+) -> Dict[str, Any]:
+    """
+    Monte Carlo simulation for cost and schedule risk.
+
+    - base_cost: nominal total cost (INR lakhs / crores as per your unit)
+    - cost_cv: coefficient of variation for cost (std / mean)
+    - base_duration_days: planned duration in days
+    - duration_cv: coefficient of variation for duration
+    - n_sims: number of simulation runs
+    - cost_heads: per-item / per-head costs (amounts, or (amount, cv)
+      pairs, cv defaulting to cost_cv); total cost is their correlated
+      sum and base_cost becomes their total. None: one head of base_cost
+    - correlation: between cost heads (scalar or matrix), see
+      src/monte_carlo.correlation_factor
+    - duration_corr: correlation of duration with every cost head
+    - sampler: random | lhs | sobol
+    - rel_tol: adaptive mode. Instead of n_sims, run batches of
+      batch_size until the `confidence` intervals of P10 / P50 / P90
+      (cost and duration) are within +/- rel_tol of the estimates, or
+      max_sims is reached ("converged" reports which)
+
+    Runs in chunks with streaming quantile sketches (bounded memory for
+    any n_sims). Returns summary statistics, percentile estimates and
+    their confidence intervals. Results are memoized on the full
+    parameter tuple, so repeated calls are free.
+    """
+    if rel_tol is not None and not rel_tol > 0:
+        raise ValueError(f"rel_tol must be > 0 (or None for a fixed n_sims), got {rel_tol!r}")
+    if rel_tol is None and int(n_sims) < 1:
+        raise ValueError(f"n_sims must be >= 1, got {n_sims!r}")
+    if rel_tol is not None and (int(batch_size) < 1 or int(max_sims) < 1):
+        raise ValueError(f"batch_size and max_sims must be >= 1, got {batch_size!r} / {max_sims!r}")
+
+    heads = _heads(cost_heads, cost_cv) if cost_heads else [(float(base_cost), float(cost_cv))]
+    if not np.isscalar(correlation):
+        correlation = tuple(map(tuple, np.asarray(correlation, dtype=np.float64).tolist()))
+
+    summary = _run_cached(
+        tuple(heads), (float(base_duration_days), float(duration_cv)),
+        None if rel_tol else int(n_sims), int(random_seed), correlation, float(duration_corr),
+        sampler, int(chunk_size), rel_tol, float(confidence), int(batch_size), int(max_sims)
+    )
+    # callers may modify the result; the cached copy must not change
+    return copy.deepcopy(summary)
+
+
+@lru_cache(maxsize=MC_CACHE_SIZE)
+def _run_cached(heads, duration, n_sims, seed, correlation, duration_corr, sampler, chunk_size,
+                rel_tol, confidence, batch_size, max_sims) -> Dict[str, Any]:
+    sim = Simulation(
+        list(heads), duration,
+        correlation=correlation if np.isscalar(correlation) else np.array(correlation),
+        duration_corr=duration_corr, sampler=sampler, seed=seed, chunk_size=chunk_size
+    )
+
+    if not rel_tol:
+        sim.run(n_sims)
+        return _summary(sim, sum(m for m, _ in heads), duration[0], confidence)
+
+    while sim.n_sims < max_sims:
+        sim.run(min(batch_size, max_sims - sim.n_sims))
+        if _ci_rel_halfwidth(sim, confidence) <= rel_tol:
+            break
+
+    summary = _summary(sim, sum(m for m, _ in heads), duration[0], confidence)
+    summary["rel_tol"] = rel_tol
+    summary["converged"] = summary["ci_rel_halfwidth"] <= rel_tol
+    status = "converged" if summary["converged"] else "stopped at max_sims"
+    print(f"[INFO] Monte Carlo {status}: {sim.n_sims} sims, "
+          f"CI +/-{summary['ci_rel_halfwidth'] * 100:.2f}% (target {rel_tol * 100:.2f}%)")
+    return summary
+
+
+def _ci_rel_halfwidth(sim: Simulation, confidence: float) -> float:
+    """
+    Largest CI half-width of the tracked percentiles, relative to the
+    estimate. A zero estimate counts as converged only if its interval is
+    empty too; a NaN never does.
+    """
+    worst = 0.0
+    for sketch in (sim.cost, sim.duration):
+        est = np.abs(sketch.quantiles(CI_QUANTILES))
+        lo, hi = sketch.quantile_ci(CI_QUANTILES, confidence)
+        half = (hi - lo) / 2
+        rel = np.divide(half, est, out=np.where(half == 0, 0.0, np.inf), where=est > 0)
+        if np.isnan(rel).any():
+            return float("inf")
+        worst = max(worst, float(np.max(rel)))
+    return worst
+
+
+def _summary(sim: Simulation, base_cost: float, base_duration_days: float, confidence: float) -> Dict[str, Any]:
+    cost, dur = sim.cost, sim.duration
+
+    # overruns are monotone in cost / duration: their percentiles follow directly
+    c10, c50, c90 = cost.quantiles(CI_QUANTILES)
+    d10, d50, d90 = dur.quantiles(CI_QUANTILES)
+    cost_pct = lambda v: float((v - base_cost) / base_cost * 100.0)
+    dur_pct = lambda v: float((v - base_duration_days) / base_duration_days * 100.0)
+
+    def ci(sketch, names):
+        lo, hi = sketch.quantile_ci(CI_QUANTILES, confidence)
+        return {name: [float(a), float(b)] for name, a, b in zip(names, lo, hi)}
+
+    return {
+        "n_sims": sim.n_sims,
+        "sampler": sim.sampler,
+        "cost_heads": sim.k,
+        "cost": {
+            "mean": cost.mean,
+            "std": cost.std,
+            "p10": float(c10),
+            "p50": float(c50),
+            "p90": float(c90),
+            "overrun_pct_mean": cost_pct(cost.mean),
+            "overrun_pct_p90": cost_pct(c90)
+        },
+        "duration": {
+            "mean_days": dur.mean,
+            "std_days": dur.std,
+            "p10_days": float(d10),
+            "p50_days": float(d50),
+            "p90_days": float(d90),
+            "overrun_pct_mean": dur_pct(dur.mean),
+            "overrun_pct_p90": dur_pct(d90)
+        },
+        "cost_overrun_distribution_pct": {
+            "p10": cost_pct(c10),
+            "p50": cost_pct(c50),
+            "p90": cost_pct(c90)
+        },
+        "duration_overrun_distribution_pct": {
+            "p10": dur_pct(d10),
+            "p50": dur_pct(d50),
+            "p90": dur_pct(d90)
+        },
+        "confidence": confidence,
+        "ci": {
+            "cost": ci(cost, ("p10", "p50", "p90")),
+            "duration": ci(dur, ("p10_days", "p50_days", "p90_days"))
+        },
+        "ci_rel_halfwidth": _ci_rel_halfwidth(sim, confidence)
+    }
+
+
+def _heads(cost_heads: Sequence[Any], cost_cv: float) -> List[tuple]:
+    """Positive (amount, cv) pairs from amounts or (amount, cv) pairs."""
+    heads = []
+    for h in cost_heads:
+        amount, cv = (h if isinstance(h, (tuple, list)) else (h, cost_cv))
+        if amount and amount > 0:
+            heads.append((float(amount), float(cv)))
+    if not heads:
+        raise ValueError("cost_heads has no positive amounts")
+    return heads
+
+
+def run_monte_carlo_reference(
     base_cost: float,
     cost_cv: float = 0.2,
     base_duration_days: float = 365,
@@ -11,6 +199,9 @@ def run_monte_carlo(
     random_seed: int = 42
 ) -> Dict[str, Any]:
     """
+    Original single-lognormal implementation, kept as the reference for
+    src/monte_carlo_benchmark.py. Use run_monte_carlo.
+
     Monte Carlo simulation for cost and schedule risk.
 
     - base_cost: nominal total cost (INR lakhs / crores as per your unit)
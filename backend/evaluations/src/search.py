@@ -1,44 +1,47 @@
 import os
+from typing import Iterator, List
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 
-from src.vectorstore import FaissVectorStore
+from src.llm import get_llm
+from src.index_manager import IndexManager
+from src.embedding_models import DEFAULT_EMBEDDING_MODEL
 from src.web_search import duckduckgo_search
+from src.concurrency import ordered_map
 
 load_dotenv()
 
+# Concurrent LLM calls per /ask_batch request
+BATCH_WORKERS = int(os.getenv("ASK_BATCH_WORKERS", "8"))
+
 class RAGSearch:
-    def __init__(self, persist_dir="dpr_faiss_store", embedding_model="all-MiniLM-L6-v2", llm_model="llama-3.1-8b-instant"):
+    def __init__(self, persist_dir="dpr_faiss_store", embedding_model=DEFAULT_EMBEDDING_MODEL, llm_model="llama-3.1-8b-instant", indexes: IndexManager | None = None):
         self.persist_dir = persist_dir
-        self.vectorstore = FaissVectorStore(persist_dir, embedding_model)
+        self.indexes = indexes or IndexManager(persist_dir, model_name=embedding_model)
 
-        loaded = self.vectorstore.safe_load()
-        if not loaded:
-            print("[INFO] FAISS index not loaded. Upload DPR first.")
+        if not self.indexes.list_ids():
+            print("[INFO] No DPR indexes found. Upload DPR first.")
 
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError("Missing GROQ_API_KEY")
 
-        self.llm = ChatGroq(
-            groq_api_key=api_key,
-            model=llm_model,
-            max_tokens=1500
-        )
+        self.llm = get_llm(llm_model, max_tokens=1500)
 
-    def search_and_summarize(self, query: str, top_k: int = 5):
-        if not self.vectorstore.index:
-            return "No FAISS index. Upload a DPR first."
+    def _store(self, dpr_id: str | None):
+        dpr_id = dpr_id or self.indexes.latest()
+        vectorstore = self.indexes.get(dpr_id) if dpr_id else None
+        if vectorstore is None or not vectorstore.index:
+            return None
+        return vectorstore
 
-        results = self.vectorstore.query(query, top_k=top_k)
+    def _prompt(self, query: str, results, web_results):
         dpr_context = "\n\n".join(
             r["metadata"].get("text", "")[:1500] for r in results
         )
-
-        web_results = duckduckgo_search(query, max_results=3)
         web_context = "\n".join(web_results)
 
-        prompt = f"""
+        return f"""
 You are a DPR expert.
 
 ### DPR Context:
@@ -59,5 +62,53 @@ Rules:
 Answer:
 """
 
-        res = self.llm.invoke([prompt])
+    def _answer(self, query: str, results):
+        web_results = duckduckgo_search(query, max_results=3)
+        res = self.llm.invoke([self._prompt(query, results, web_results)])
         return res.content.strip()
+
+    def _gather(self, vectorstore, query: str, top_k: int):
+        # DPR retrieval and web validation are independent: run them together
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            results = pool.submit(vectorstore.query, query, top_k)
+            web = pool.submit(duckduckgo_search, query, 3)
+            return results.result(), web.result()
+
+    def search_and_summarize(self, query: str, top_k: int = 5, dpr_id: str | None = None):
+        vectorstore = self._store(dpr_id)
+        if vectorstore is None:
+            return "No FAISS index. Upload a DPR first."
+
+        results, web_results = self._gather(vectorstore, query, top_k)
+        res = self.llm.invoke([self._prompt(query, results, web_results)])
+        return res.content.strip()
+
+    def stream_search_and_summarize(self, query: str, top_k: int = 5, dpr_id: str | None = None) -> Iterator[str]:
+        """
+        Streaming variant of search_and_summarize: retrieves context first,
+        then yields answer tokens as the model produces them.
+        """
+        vectorstore = self._store(dpr_id)
+        if vectorstore is None:
+            yield "No FAISS index. Upload a DPR first."
+            return
+
+        results, web_results = self._gather(vectorstore, query, top_k)
+        yield from self.llm.stream([self._prompt(query, results, web_results)])
+
+    def search_and_summarize_batch(self, queries: List[str], top_k: int = 5, dpr_id: str | None = None):
+        """
+        Answer many questions at once: one batched encode + index search for
+        all of them, then the per-question LLM calls run concurrently.
+        """
+        vectorstore = self._store(dpr_id)
+        if vectorstore is None:
+            return ["No FAISS index. Upload a DPR first."] * len(queries)
+
+        all_results = vectorstore.query_batch(queries, top_k=top_k)
+        return ordered_map(
+            lambda pair: self._answer(*pair),
+            list(zip(queries, all_results)),
+            max_workers=BATCH_WORKERS,
+            default="Failed to answer this question."
+        )
@@ -0,0 +1,142 @@
+# src/section_index.py
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.pdf_document import ExtractedDocument
+
+# font-size detection keeps at most this many heading levels
+MAX_HEADING_LEVELS = 3
+
+# an outline with fewer entries than this is ignored in favour of typography
+MIN_TOC_ENTRIES = 3
+
+
+class Section:
+    def __init__(self, title: str, level: int, page_start: int, page_end: int,
+                 char_start: int, char_end: int, source: str):
+        self.title = title
+        self.level = level
+        self.page_start = page_start      # 0-based, inclusive
+        self.page_end = page_end          # 0-based, inclusive
+        self.char_start = char_start      # offsets into ExtractedDocument.text
+        self.char_end = char_end
+        self.source = source              # toc | font
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Section":
+        return cls(**d)
+
+    def __repr__(self):
+        return f"Section({self.title!r}, level={self.level}, pages={self.page_start}-{self.page_end})"
+
+
+class SectionIndex:
+    """
+    DPR sections (from the PDF outline, or from heading typography when
+    there is no usable outline) mapped to page and character ranges of
+    the document text. A section runs until the next heading of the same
+    or a higher level. Lookups match keywords against section titles, so
+    callers can slice the relevant span instead of scanning the whole text.
+    """
+
+    def __init__(self, sections: List[Section]):
+        self.sections = sections
+
+    def find(self, keywords: Iterable[str]) -> List[Section]:
+        """Sections whose title contains any of `keywords` (case-insensitive), in document order."""
+        keywords = [k.lower() for k in keywords]
+        return [s for s in self.sections if any(k in s.title.lower() for k in keywords)]
+
+    def first(self, keywords: Iterable[str]) -> Optional[Section]:
+        found = self.find(keywords)
+        return found[0] if found else None
+
+    def text(self, document_text: str, keywords: Iterable[str]) -> str:
+        """Concatenated text of all matching sections (nested matches only once)."""
+        parts, covered = [], -1
+        for s in self.find(keywords):
+            if s.char_start < covered:
+                continue
+            parts.append(document_text[s.char_start:s.char_end])
+            covered = s.char_end
+        return "\n".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"sections": [s.to_dict() for s in self.sections]}
+
+    @classmethod
+    def from_dict(cls, d: Optional[Dict[str, Any]]) -> "SectionIndex":
+        return cls([Section.from_dict(s) for s in (d or {}).get("sections", [])])
+
+    def __len__(self):
+        return len(self.sections)
+
+
+def _locate(document: ExtractedDocument, page: int, title: str, cursor: Dict[int, int]) -> int:
+    """Offset of `title` on `page` (searching after earlier headings), else the page start."""
+    text = document.pages[page].lower()
+    pos = text.find(title.lower()[:60], cursor.get(page, 0))
+    if pos == -1:
+        # outline titles are often reflowed; try the first few words
+        pos = text.find(" ".join(title.lower().split()[:3]), cursor.get(page, 0))
+    if pos == -1:
+        return document.page_offsets[page]
+    cursor[page] = pos + 1
+    return document.page_offsets[page] + pos
+
+
+def _toc_entries(document: ExtractedDocument):
+    cursor: Dict[int, int] = {}
+    entries = []
+    for level, title, page in document.toc:
+        page = min(max(page - 1, 0), document.page_count - 1)   # outline pages are 1-based
+        title = " ".join(str(title).split())
+        if title:
+            entries.append((level, title, page, _locate(document, page, title, cursor)))
+    return entries
+
+
+def _heading_entries(document: ExtractedDocument):
+    headings = document.headings
+    if not headings:
+        return []
+
+    # running headers / footers repeat on most pages: not section titles
+    if document.page_count >= 3:
+        counts = Counter(text.lower() for _, text, _, _ in headings)
+        headings = [h for h in headings if counts[h[1].lower()] <= document.page_count // 2]
+
+    # larger font -> higher level; bold body-size text is the lowest level
+    sizes = sorted({round(size * 2) / 2 for _, _, size, _ in headings if size > document.body_size}, reverse=True)
+    levels = {size: min(i + 1, MAX_HEADING_LEVELS) for i, size in enumerate(sizes)}
+    bold_level = min(len(sizes) + 1, MAX_HEADING_LEVELS)
+
+    cursor: Dict[int, int] = {}
+    entries = []
+    for page, text, size, _ in headings:
+        level = levels.get(round(size * 2) / 2, bold_level)
+        entries.append((level, text, page, _locate(document, page, text, cursor)))
+    return entries
+
+
+def build_section_index(document: ExtractedDocument) -> SectionIndex:
+    """Section index for an extracted DPR (outline first, typography as fallback)."""
+    if len(document.toc) >= MIN_TOC_ENTRIES:
+        entries, source = _toc_entries(document), "toc"
+    else:
+        entries, source = _heading_entries(document), "font"
+    entries.sort(key=lambda e: e[3])
+
+    end_of_text = len(document.text)
+    sections = []
+    for i, (level, title, page, start) in enumerate(entries):
+        end = next((e[3] for e in entries[i + 1:] if e[0] <= level and e[3] > start), end_of_text)
+        page_end = max(page, bisect_right(document.page_offsets, max(end - 1, 0)) - 1)
+        sections.append(Section(title, level, page, page_end, start, end, source))
+
+    print(f"[INFO] Section index: {len(sections)} sections from {source}")
+    return SectionIndex(sections)
@@ -0,0 +1,259 @@
+# src/sor_database.py
+"""
+Offline schedule-of-rates (SOR) database with a trigram index.
+
+Rates are loaded from the CSV / JSON files under SOR_PATH (a file or a
+directory); nothing is fetched from the network. Recognised columns
+(case-insensitive, first match wins):
+
+    code         code | item_code | sor_code | item_no
+    description  description | item | desc | particulars
+    unit         unit | uom
+    rate         rate | unit_rate | rate_inr
+
+JSON files hold either a list of such objects or {"items": [...]}.
+data/sor/README.md documents the format; data/sor/sample_sor.csv is a
+small illustrative set to replace with the applicable SOR.
+"""
+import os
+import re
+import csv
+import json
+import hashlib
+import threading
+import numpy as np
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+SOR_PATH = os.getenv("SOR_PATH", os.path.join("data", "sor"))
+# minimum description similarity (0..1, see SORDatabase.match) for a match
+SOR_MIN_SCORE = float(os.getenv("SOR_MIN_SCORE", "0.35"))
+# added to the score of SOR items in the BOQ item's unit
+UNIT_BONUS = 0.1
+
+_FIELDS = {
+    "code": ["code", "item_code", "sor_code", "item_no"],
+    "description": ["description", "item", "desc", "particulars"],
+    "unit": ["unit", "uom"],
+    "rate": ["rate", "unit_rate", "rate_inr"]
+}
+
+# spelling variants of the same unit
+_UNIT_ALIASES = {
+    "cum": ["cum", "cu.m", "cu m", "m3", "cubic metre", "cubic meter", "cmt"],
+    "sqm": ["sqm", "sq.m", "sq m", "m2", "square metre", "square meter", "smt"],
+    "m": ["m", "rm", "rmt", "metre", "meter", "running metre", "lm"],
+    "kg": ["kg", "kgs", "kilogram"],
+    "t": ["t", "mt", "tonne", "ton", "tonnes", "quintal"],
+    "nos": ["nos", "no", "no.", "each", "ea", "number", "numbers"],
+    "l": ["l", "ltr", "litre", "liter"],
+    "ls": ["ls", "l.s.", "lump sum", "lumpsum", "job"]
+}
+_UNIT_MAP = {alias: unit for unit, aliases in _UNIT_ALIASES.items() for alias in aliases}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_unit(unit: str) -> str:
+    u = " ".join((unit or "").lower().replace("per ", "").split())
+    return _UNIT_MAP.get(u, _UNIT_MAP.get(u.rstrip("."), u))
+
+
+def trigrams(text: str) -> set:
+    """Character trigrams of each word, padded so short words still count."""
+    grams = set()
+    for word in _NON_ALNUM.sub(" ", (text or "").lower()).split():
+        w = f" {word} "
+        grams.update(w[i:i + 3] for i in range(len(w) - 2))
+    return grams
+
+
+def _to_float(value) -> float:
+    try:
+        return float(str(value).replace(",", "").replace("₹", "").strip())
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _pick(row: Dict[str, Any], field: str):
+    lowered = {str(k).strip().lower(): v for k, v in row.items()}
+    return next((lowered[k] for k in _FIELDS[field] if lowered.get(k) not in (None, "")), None)
+
+
+class SORDatabase:
+    """
+    In-memory SOR items with an inverted trigram index.
+
+    match() scores candidates on description trigram sets: postings of
+    the query's trigrams are concatenated and counted with one
+    np.bincount, so a lookup touches only the posting lists, not the item
+    texts. The score averages query coverage (BOQ descriptions are
+    usually abbreviated SOR texts) with Dice similarity; items in the
+    same (normalised) unit are preferred.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], fingerprint: str = ""):
+        self.records = records
+        self.fingerprint = fingerprint   # changes whenever the source files do
+        self.rate = np.array([r["rate"] for r in records], dtype=np.float64)
+        self.units = [normalize_unit(r["unit"]) for r in records]
+
+        postings = defaultdict(list)
+        sizes = []
+        for i, r in enumerate(records):
+            grams = trigrams(r["description"])
+            sizes.append(len(grams))
+            for g in grams:
+                postings[g].append(i)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._sizes = np.array(sizes, dtype=np.float64)
+
+        unit_codes = {u: c for c, u in enumerate(sorted(set(self.units)))}
+        self._unit_codes = unit_codes
+        self._unit = np.array([unit_codes[u] for u in self.units], dtype=np.int32)
+
+    @classmethod
+    def load(cls, path: str = SOR_PATH) -> "SORDatabase":
+        files = []
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith((".csv", ".json")))
+        elif os.path.exists(path):
+            files = [path]
+
+        records = []
+        for file in files:
+            try:
+                records.extend(cls._read(file))
+            except Exception as e:
+                # one bad file must not take the rest (or the evaluation) down
+                print(f"[WARN] Skipping SOR file {file}: {e}")
+
+        if files:
+            print(f"[INFO] Loaded {len(records)} SOR items from {len(files)} files")
+        elif not os.path.exists(path):
+            print(f"[WARN] SOR_PATH {os.path.abspath(path)} does not exist: BOQ rates will not be "
+                  f"benchmarked. Add CSV / JSON schedule-of-rates files there (format: data/sor/README.md)")
+        else:
+            print(f"[WARN] No .csv / .json schedule-of-rates files in {os.path.abspath(path)}: "
+                  f"BOQ rates will not be benchmarked (format: data/sor/README.md)")
+
+        stats = [(f, os.path.getsize(f), os.path.getmtime(f)) for f in files if os.path.exists(f)]
+        fingerprint = hashlib.sha256(json.dumps(stats).encode("utf-8")).hexdigest()
+        return cls(records, fingerprint)
+
+    @staticmethod
+    def _read(file: str) -> List[Dict[str, Any]]:
+        if file.lower().endswith(".json"):
+            with open(file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            rows = data.get("items", []) if isinstance(data, dict) else data
+            if not isinstance(rows, list):
+                raise ValueError("expected a list of items")
+        else:
+            with open(file, "r", encoding="utf-8-sig", newline="") as f:
+                rows = list(csv.DictReader(f))
+
+        records = []
+        source = os.path.basename(file)
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+            desc, rate = _pick(row, "description"), _to_float(_pick(row, "rate"))
+            if not desc or np.isnan(rate):
+                continue
+            records.append({
+                "code": str(_pick(row, "code") or ""),
+                "description": " ".join(str(desc).split()),
+                "unit": str(_pick(row, "unit") or ""),
+                "rate": rate,
+                "source": source
+            })
+        return records
+
+    def __len__(self):
+        return len(self.records)
+
+    def match(self, description: str, unit: str = "", min_score: float = SOR_MIN_SCORE) -> Tuple[Optional[int], float]:
+        """(index of the nearest SOR item, score), or (None, best score) below min_score."""
+        grams = trigrams(description)
+        lists = [self._postings[g] for g in grams if g in self._postings]
+        if not lists:
+            return None, 0.0
+
+        common = np.bincount(np.concatenate(lists), minlength=len(self.records))
+        scores = 0.5 * common / len(grams) + common / (len(grams) + self._sizes)
+        code = self._unit_codes.get(normalize_unit(unit))
+        if code is not None:
+            scores = scores + UNIT_BONUS * (self._unit == code)
+
+        best = int(np.argmax(scores))
+        score = float(min(scores[best], 1.0))
+        return (best, score) if score >= min_score else (None, score)
+
+    def match_many(self, items: List[Dict[str, Any]], min_score: float = SOR_MIN_SCORE) -> List[Tuple[Optional[int], float]]:
+        """match() for every BOQ item; repeated (description, unit) pairs are looked up once."""
+        seen: Dict[Tuple[str, str], Tuple[Optional[int], float]] = {}
+        out = []
+        for it in items:
+            key = (it.get("desc") or "", it.get("unit") or "")
+            if key not in seen:
+                seen[key] = self.match(key[0], key[1], min_score)
+            out.append(seen[key])
+        return out
+
+    def compare(self, items: List[Dict[str, Any]], min_score: float = SOR_MIN_SCORE) -> List[Dict[str, Any]]:
+        """
+        Per-item benchmark rows for a whole BOQ: nearest SOR item, its
+        rate, and the BOQ rate's deviation from it (only when the units
+        agree). Deviations are computed in one vectorized pass.
+        """
+        matches = self.match_many(items, min_score)
+        n = len(items)
+        boq_rate = np.array([it.get("rate", np.nan) for it in items], dtype=np.float64)
+        sor_rate = np.full(n, np.nan)
+        same_unit = np.zeros(n, dtype=bool)
+        for i, (idx, _) in enumerate(matches):
+            if idx is not None:
+                sor_rate[i] = self.rate[idx]
+                sor_unit = self.units[idx]
+                same_unit[i] = not sor_unit or sor_unit == normalize_unit(items[i].get("unit", ""))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta_pct = np.where(same_unit & (sor_rate > 0), (boq_rate - sor_rate) / sor_rate * 100.0, np.nan)
+
+        rows = []
+        for i, (idx, score) in enumerate(matches):
+            row = {"desc": items[i].get("desc", ""), "unit": items[i].get("unit", ""),
+                   "rate": None if np.isnan(boq_rate[i]) else float(boq_rate[i]),
+                   "page": items[i].get("page"), "match_score": round(score, 3)}
+            if idx is not None:
+                sor = self.records[idx]
+                row.update({
+                    "sor_code": sor["code"],
+                    "sor_description": sor["description"],
+                    "sor_unit": sor["unit"],
+                    "sor_rate": sor["rate"],
+                    "sor_source": sor["source"],
+                    "unit_match": bool(same_unit[i]),
+                    "delta_pct": None if np.isnan(delta_pct[i]) else round(float(delta_pct[i]), 2)
+                })
+            rows.append(row)
+        return rows
+
+
+_db: Optional[SORDatabase] = None
+_db_lock = threading.Lock()
+
+
+def get_sor_database() -> SORDatabase:
+    """Process-wide SOR database, loaded from SOR_PATH on first use."""
+    global _db
+    with _db_lock:
+        if _db is None:
+            try:
+                _db = SORDatabase.load(SOR_PATH)
+            except Exception as e:
+                # benchmarking is optional: evaluate without SOR data rather than fail
+                print(f"[WARN] Could not load SOR data from {SOR_PATH}: {e}")
+                _db = SORDatabase([])
+        return _db
@@ -1,60 +1,142 @@
 import os
+import json
 import faiss
-import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from src.chunk_store import ChunkStore
+from src.query_batcher import get_query_batcher
+from src.embedding_models import get_embedding_model, encode_texts, DEFAULT_EMBEDDING_MODEL
+from src.index_factory import build_index, tune_index, INDEX_TYPE, INDEX_MEMORY_MB, INDEX_NPROBE, INDEX_EF_SEARCH
+
+# Open the index with mmap so worker processes share the page cache
+# instead of each holding a private copy
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+# IVF / IVF-PQ cannot be mmapped from faiss.index: their inverted lists are
+# saved to this file beside it and mapped from there on load
+IVF_DATA_FILE = "faiss.ivfdata"
+ONDISK_FLAGS = faiss.IO_FLAG_ONDISK_SAME_DIR | faiss.IO_FLAG_READ_ONLY
+
+
+def _invlists_to_disk(index, path):
+    """Move an IVF index's inverted lists into an OnDiskInvertedLists file at `path`; no-op for other types."""
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return False
+    ondisk = faiss.OnDiskInvertedLists(ivf.nlist, ivf.code_size, path + ".tmp")
+    ondisk.merge_from_1(ivf.invlists)
+    ivf.replace_invlists(ondisk, True)
+    ondisk.this.disown()   # the index owns it now
+    os.replace(path + ".tmp", path)
+    ondisk.filename = path
+    return True
+
 
 class FaissVectorStore:
 
-    def __init__(self, persist_dir, model_name="all-MiniLM-L6-v2"):
+    def __init__(self, persist_dir, model_name=DEFAULT_EMBEDDING_MODEL, index_type=INDEX_TYPE,
+                 memory_budget_mb=INDEX_MEMORY_MB, nprobe=INDEX_NPROBE, ef_search=INDEX_EF_SEARCH):
         self.persist_dir = persist_dir
         os.makedirs(self.persist_dir, exist_ok=True)   # <--- IMPORTANT
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.index_type = index_type
+        self.memory_budget_mb = memory_budget_mb
+        self.nprobe = nprobe
+        self.ef_search = ef_search
         self.index = None
+        self.index_info = {}
         self.metadata = []
 
+    @property
+    def model(self):
+        # shared, lazily loaded on first encode
+        return get_embedding_model(self.model_name)
+
     def safe_load(self):
         faiss_path = os.path.join(self.persist_dir, "faiss.index")
-        meta_path = os.path.join(self.persist_dir, "metadata.pkl")
 
-        if not (os.path.exists(faiss_path) and os.path.exists(meta_path)):
+        if not (os.path.exists(faiss_path) and ChunkStore.exists(self.persist_dir)):
             print("[WARN] FAISS index not found. Needs rebuild.")
             return False
-        
-        self.index = faiss.read_index(faiss_path)
-        self.metadata = pickle.load(open(meta_path, "rb"))
+
+        info_path = os.path.join(self.persist_dir, "index.json")
+        if os.path.exists(info_path):
+            with open(info_path, "r", encoding="utf-8") as f:
+                self.index_info = json.load(f)
+
+        on_disk = os.path.exists(os.path.join(self.persist_dir, IVF_DATA_FILE))
+        try:
+            self.index = faiss.read_index(faiss_path, ONDISK_FLAGS if on_disk else MMAP_FLAGS)
+        except RuntimeError:
+            # e.g. an IVF index saved before its lists were written to IVF_DATA_FILE
+            self.index = faiss.read_index(faiss_path)
+            kind = self.index_info.get("factory") or type(self.index).__name__
+            print(f"[WARN] {kind} index in {self.persist_dir} cannot be memory-mapped; "
+                  f"read fully into memory (rebuild it to map it)")
+        self.metadata = ChunkStore(self.persist_dir)
+
+        tune_index(self.index, nprobe=self.nprobe, ef_search=self.ef_search)
         print("[INFO] FAISS index loaded successfully.")
         return True
 
     def build_from_documents(self, docs):
         texts = [d.page_content for d in docs]
 
-        embeddings = self.model.encode(texts).astype("float32")
-        dim = embeddings.shape[1]
+        embeddings = encode_texts(texts, self.model_name)
 
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(embeddings)
+        # flat / HNSW / IVF-Flat / IVF-PQ depending on size + memory budget
+        self.index, self.index_info = build_index(
+            embeddings,
+            index_type=self.index_type,
+            memory_budget_mb=self.memory_budget_mb,
+            nprobe=self.nprobe,
+            ef_search=self.ef_search
+        )
 
-        self.metadata = [{"text": t} for t in texts]
+        self.metadata = [
+            {"text": d.page_content, "page": (d.metadata or {}).get("page")}
+            for d in docs
+        ]
 
     def save(self):
         os.makedirs(self.persist_dir, exist_ok=True)   # <--- ENSURE DIR EXISTS
 
         faiss_path = os.path.join(self.persist_dir, "faiss.index")
-        meta_path = os.path.join(self.persist_dir, "metadata.pkl")
 
-        faiss.write_index(self.index, faiss_path)
-        pickle.dump(self.metadata, open(meta_path, "wb"))
+        ivfdata_path = os.path.join(self.persist_dir, IVF_DATA_FILE)
+        if not _invlists_to_disk(self.index, ivfdata_path) and os.path.exists(ivfdata_path):
+            os.remove(ivfdata_path)   # left over from an earlier IVF build
+        faiss.write_index(self.index, faiss_path + ".tmp")
+        os.replace(faiss_path + ".tmp", faiss_path)
+        ChunkStore.write(self.persist_dir, self.metadata)
+
+        with open(os.path.join(self.persist_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(self.index_info, f, indent=2)
+
+        # serve from the mmapped columns from now on
+        self.metadata = ChunkStore(self.persist_dir)
 
         print("[INFO] FAISS index saved.")
 
-    def query(self, query_text, top_k=5):
-        query_vec = self.model.encode([query_text]).astype("float32")
-        D, I = self.index.search(query_vec, top_k)
+    def _hits(self, ids, distances):
         results = []
-        for idx, dist in zip(I[0], D[0]):
+        for idx, dist in zip(ids, distances):
+            if idx < 0:   # fewer than top_k hits (small or IVF index)
+                continue
             results.append({
                 "metadata": self.metadata[idx],
-                "distance": dist
+                "distance": float(dist)
             })
         return results
+
+    def query(self, query_text, top_k=5):
+        # micro-batched with concurrent queries + query-embedding LRU
+        D, I = get_query_batcher(self.model_name).search(self.index, query_text, top_k)
+        return self._hits(I, D)
+
+    def query_batch(self, query_texts, top_k=5):
+        """Encode all queries as one matrix and run a single index search."""
+        if not query_texts:
+            return []
+        query_vecs = get_query_batcher(self.model_name).embed(list(query_texts))
+        D, I = self.index.search(query_vecs, top_k)
+        return [self._hits(I[q], D[q]) for q in range(len(query_texts))]
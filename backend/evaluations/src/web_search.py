@@ -1,9 +1,38 @@
+import os
 import requests
+from requests.adapters import HTTPAdapter
+
+from src.cache import CACHE_DIR, LRUCache, SQLiteCache, TieredCache
+
+SEARCH_URL = "https://duckduckgo-api.vercel.app/search"
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "10"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "20000"))
+
+# Pooled keep-alive session shared by all callers (evaluation, agents, /ask ...)
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+_cache = TieredCache(
+    LRUCache(max_entries=1024, ttl=SEARCH_CACHE_TTL),
+    SQLiteCache(
+        os.path.join(CACHE_DIR, "web_search.sqlite"),
+        ttl=SEARCH_CACHE_TTL,
+        max_entries=SEARCH_CACHE_SIZE
+    )
+)
+
 
 def duckduckgo_search(query, max_results=5):
-    url = "https://duckduckgo-api.vercel.app/search"
-    try:
-        data = requests.get(url, params={"q": query}).json()
-        return [res["snippet"] for res in data["results"][:max_results]]
-    except:
-        return []
+    key = " ".join(query.split())
+    snippets = _cache.get(key)
+    if snippets is None:
+        try:
+            resp = _session.get(SEARCH_URL, params={"q": query}, timeout=SEARCH_TIMEOUT)
+            data = resp.json()
+            snippets = [res["snippet"] for res in data["results"]]
+        except Exception:
+            # failures are not cached so the next call retries the network
+            return []
+        _cache.set(key, snippets)
+    return snippets[:max_results]
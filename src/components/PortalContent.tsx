@@ -192,9 +192,20 @@ const ClientDashboard: React.FC = () => {
         body: form,
       });
 
-      const data = await res.json();
+      const queued = await res.json();
       if (!res.ok) throw new Error("AI server failed");
 
+      // Evaluation runs as a background job: poll until the result is ready
+      // (an identical, already-evaluated DPR comes back immediately)
+      let data: any = queued.status === "success" ? queued : null;
+      while (!data) {
+        await new Promise((r) => setTimeout(r, 3000));
+        const poll = await fetch(`http://localhost:8000${queued.result_url}`);
+        if (poll.status === 202) continue;
+        if (!poll.ok) throw new Error("AI server failed");
+        data = await poll.json();
+      }
+
       setEvaluation(data.evaluation);
       setIssues(data.issues);
       setReviewedPdfUrl(`http://localhost:8000/${data.highlighted_pdf}`);